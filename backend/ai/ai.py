@@ -1,5 +1,23 @@
+from typing import NamedTuple
+
 from ..moveCalculation.moveCalculator import MoveCalculator
 from ..chess import Board
+from .searchStats import SearchStats
+
+MATE_SCORE = 100000 # score of being mated at the root, mates further away score closer to 0
+
+class SearchResult(NamedTuple):
+    move: int | None # encoded move (see chess.move), None if the side to move has no legal move
+    score: int # from the point of view of the side to move
+    pv: list[int] # principal variation, starting with move
+    depth: int
+    nodes: int
+    stats: SearchStats | None = None # only filled when the search collects stats
+
+class SearchLimits(NamedTuple):
+    depth: int | None = None # None: as deep as the other limits allow, without any limit the Ai's current_depth
+    time_limit: float | None = None # seconds
+    node_limit: int | None = None
 
 class Ai:
     def __init__(self, board: Board):
@@ -9,4 +27,4 @@ class Ai:
         
     def get_move(self):
         """Should return a move as a string in Standard Algebraic Notaion"""
-        pass
\ No newline at end of file
+        pass
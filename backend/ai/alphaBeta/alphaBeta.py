@@ -0,0 +1,260 @@
+import time
+from typing import Callable
+
+from ..ai import Ai
+from ..ai import SearchResult
+from ..ai import MATE_SCORE
+from ..ai import SearchLimits
+from ..searchHandle import SearchHandle
+from ..openingBook.openingBook import OpeningBook
+from ..searchStats import SearchStats
+from .. import transpositionTable as tt
+from ..transpositionTable import TranspositionTable
+from ..moveOrdering import MoveOrdering
+from ...positionEvaluator.posititionEvaluator import PositionEvaluator
+from ...chess import util
+from ...chess import Board
+from ...chess import bitboard
+from ...chess import Piece
+
+INFINITY = MATE_SCORE + 1
+MATE_BOUND = MATE_SCORE - 1000 # scores beyond this are mates, stored relative to the node in the transposition table
+MAX_DEPTH = 64
+CHECK_LIMITS_EVERY = 1024 # nodes, must be a power of two
+
+
+class AlphaBeta(Ai):
+    """Negamax search with fail soft alpha beta pruning"""
+    def __init__(self, board: Board, color: util.PlayerColor = util.PlayerColor.Black, depth: int = 4, hash_mb: float = 16) -> None:
+        super().__init__(board)
+        self.playing_as_color = color
+        self.evaluator = PositionEvaluator()
+        self._capture_values = [self.evaluator.piece_values[figure] for figure in bitboard.FIGURES]
+        self.delta_margin = 2 * self.evaluator.piece_values[Piece.Figure.Pawn]
+        self.transposition_table = TranspositionTable(hash_mb)
+        self.move_ordering = MoveOrdering(self.moveCalculator)
+        self.current_depth = depth
+        self.nodes = 0
+        self._pv: list[list[int]] = list()
+        self._root_moves: list[int] = list()
+        self._stopped = False
+        self._stop_requested = False
+        self._deadline: float | None = None
+        self._budget_start = 0.0
+        self._node_limit: int | None = None
+        self._completed_depth = 0
+        self.opening_book: OpeningBook | None = None # asked before every search
+        self.collect_stats = False # attach a SearchStats to every result
+        self.on_iteration: Callable[[SearchResult], None] | None = None # called with the result of every completed iteration
+        self._search_handle: SearchHandle | None = None # the last background search, only one may run at a time
+
+    def set_depth(self, depth: int) -> None:
+        self.current_depth = depth
+
+    def get_move(self, board: Board | None = None, time_limit: float | None = None, node_limit: int | None = None) -> SearchResult:
+        """Searches board (default: the board the Ai was created with). Without limits to current_depth plies,
+        with a time limit (seconds) or node limit as deep as the budget allows.
+        Limits are only checked once depth 1 is complete, and after that every CHECK_LIMITS_EVERY nodes,
+        so a search can overshoot them by that many nodes, or by all of depth 1 (its quiescence search included).
+        The board is played on in place and is back in its original position afterwards"""
+        board = self.board if board is None else board
+        depth = self.current_depth if time_limit is None and node_limit is None else MAX_DEPTH
+        return self.search(board, depth, time_limit, node_limit)
+
+    def search(self, board: Board, depth: int, time_limit: float | None = None, node_limit: int | None = None) -> SearchResult:
+        """Iterative deepening up to depth. When the budget runs out the running iteration is dropped
+        and the result of the last completed one is returned. Depth 1 always completes, also with a depth below 1. Book moves are played without searching"""
+        book_result = self._book_result(board)
+        if book_result:
+            return book_result
+        start = time.perf_counter()
+        self.nodes = 0
+        self.transposition_table.new_search()
+        self.move_ordering.new_search()
+        self._stopped = False
+        self._stop_requested = False
+        self._deadline = start + time_limit if time_limit is not None else None
+        self._budget_start = start
+        self._node_limit = node_limit
+        self._completed_depth = 0
+        stats = SearchStats() if self.collect_stats else None
+        if stats:
+            stats.attach(self, board)
+        result = None
+        try:
+            for iteration_depth in range(1, max(depth, 1) + 1):
+                self._pv = [list() for _ in range(iteration_depth + 1)]
+                self._root_moves = self.move_ordering.root_moves(board, result.move if result else 0)
+                score = self._negamax(board, iteration_depth, -INFINITY, INFINITY, 0)
+                if self._stopped:
+                    break
+                pv = self._pv[0]
+                if stats:
+                    stats.end_iteration(iteration_depth, self.nodes)
+                result = SearchResult(pv[0] if pv else None, score, list(pv), iteration_depth, self.nodes, stats)
+                self._completed_depth = iteration_depth
+                if self.on_iteration:
+                    self.on_iteration(result)
+                if self._stop_requested:
+                    break
+                if not pv or abs(score) > MATE_BOUND:
+                    break # no legal move or forced mate found, deeper iterations can not change the move
+                if self._no_time_for_next_iteration():
+                    break
+                if self._node_limit is not None and self.nodes >= self._node_limit:
+                    break
+        finally:
+            if stats:
+                stats.detach(self.nodes)
+        return result._replace(nodes=self.nodes)
+
+    def start_search(self, board: Board, limits: SearchLimits = SearchLimits(), ponder_move: int = 0) -> SearchHandle:
+        """Searches a copy of board in a background thread. With a ponder_move the search runs on the position after it
+        without limits, until SearchHandle.ponderhit gives it a time limit or it is stopped.
+        The searches share the Ai's state, a search that is still running has to be stopped and waited for first"""
+        if self._search_handle is not None and not self._search_handle.done():
+            raise Exception("The AI is already searching, stop the running search and wait for its result first")
+        depth = limits.depth
+        if depth is None:
+            depth = self.current_depth if limits.time_limit is None and limits.node_limit is None and not ponder_move else MAX_DEPTH
+        self._search_handle = SearchHandle(self, board, depth, limits, ponder_move)
+        return self._search_handle
+
+    def stop(self) -> None:
+        """Ends a running search as soon as possible, it returns the last completed iteration"""
+        self._stop_requested = True
+
+    def set_time_limit(self, time_limit: float, start: float | None = None) -> None:
+        """Gives the running search a time limit (seconds) from start (a time.perf_counter() value, default: now)"""
+        self._budget_start = time.perf_counter() if start is None else start
+        self._deadline = self._budget_start + time_limit
+
+    def _book_result(self, board: Board) -> SearchResult | None:
+        book_move = self.opening_book.choose_move(board) if self.opening_book is not None else None
+        if book_move is None:
+            return None
+        return SearchResult(book_move, 0, [book_move], 0, 0)
+
+    def _no_time_for_next_iteration(self) -> bool:
+        """The next iteration takes several times longer than all before it, with half the budget gone it would not finish"""
+        return self._deadline is not None and time.perf_counter() - self._budget_start > (self._deadline - self._budget_start) / 2
+
+    def _check_limits(self) -> None:
+        if not self._completed_depth:
+            return
+        if self._stop_requested or self._deadline is not None and time.perf_counter() >= self._deadline or self._node_limit is not None and self.nodes >= self._node_limit:
+            self._stopped = True
+
+    def _negamax(self, board: Board, depth: int, alpha: int, beta: int, ply: int) -> int:
+        """Score of board for the side to move. A result <= alpha is an upper bound, a result >= beta a lower bound"""
+        self.nodes += 1
+        if not self.nodes & (CHECK_LIMITS_EVERY - 1):
+            self._check_limits()
+        pv = self._pv
+        pv[ply] = list()
+        if depth == 0:
+            return self._quiescence(board, alpha, beta, ply)
+        if ply and self.evaluator.bitbases is not None and self.evaluator.bitbase_evaluation(board) == 0:
+            return 0 # bitbase draw. Won positions are searched on, so the mate is found, and scored by the bitbase at the leaves
+        hash_move = 0
+        entry = self.transposition_table.probe(board.hash)
+        if entry:
+            entry_depth, bound, score, hash_move = entry
+            if entry_depth >= depth and ply > 0:
+                score = self._score_from_table(score, ply)
+                if bound == tt.EXACT or bound == tt.LOWER and score >= beta or bound == tt.UPPER and score <= alpha:
+                    if hash_move:
+                        pv[ply] = [hash_move]
+                    return score
+
+        original_alpha = alpha
+        best_score = -INFINITY
+        best_move = 0
+        searched = 0
+        variants = self._root_moves if ply == 0 else self.move_ordering.ordered_moves(board, ply, hash_move)
+        for variant in variants:
+            searched += 1
+            undo = board.make_move(variant)
+            score = -self._negamax(board, depth - 1, -beta, -alpha, ply + 1)
+            board.unmake_move(undo)
+            if self._stopped:
+                return 0 # incomplete, must not reach the table or the pv
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    best_move = variant
+                    pv[ply] = [variant] + pv[ply + 1]
+                    if alpha >= beta:
+                        self.move_ordering.update(board, variant, ply, depth)
+                        break
+        if not searched:
+            return -MATE_SCORE + ply if self.moveCalculator.in_check(board) else 0
+
+        if best_score >= beta:
+            bound = tt.LOWER
+        elif best_score > original_alpha:
+            bound = tt.EXACT
+        else:
+            bound = tt.UPPER
+        self.transposition_table.store(board.hash, depth, bound, self._score_to_table(best_score, ply), best_move)
+        return best_score
+
+    def _quiescence(self, board: Board, alpha: int, beta: int, ply: int) -> int:
+        """Plays out captures and promotions until the position is quiet, so no leaf is scored in the middle of an exchange.
+        The side to move may always stand pat with the static score, unless it is in check"""
+        self.nodes += 1
+        if not self.nodes & (CHECK_LIMITS_EVERY - 1):
+            self._check_limits()
+        if self.moveCalculator.in_check(board):
+            moves = self.moveCalculator.generate_moves(board)
+            if not moves:
+                return -MATE_SCORE + ply
+            stand_pat = best_score = -INFINITY
+        else:
+            stand_pat = best_score = self._evaluate(board)
+            if stand_pat >= beta:
+                return stand_pat
+            if stand_pat > alpha:
+                alpha = stand_pat
+            moves = self.move_ordering.ordered_captures(board)
+
+        mailbox = board.mailbox
+        capture_values = self._capture_values
+        for variant in moves:
+            if stand_pat > -INFINITY and not variant >> 12:
+                victim = mailbox[variant >> 6 & 63]
+                gain = capture_values[bitboard.FIGURE_INDEX[victim.name]] if victim else capture_values[bitboard.PAWN]
+                if stand_pat + gain + self.delta_margin <= alpha:
+                    continue # delta pruning: even winning the piece for free would not raise alpha
+            undo = board.make_move(variant)
+            score = -self._quiescence(board, -beta, -alpha, ply + 1)
+            board.unmake_move(undo)
+            if self._stopped:
+                return 0
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best_score
+
+    def _score_to_table(self, score: int, ply: int) -> int:
+        """Mate scores count from the root, the table needs them counted from the stored node"""
+        if score > MATE_BOUND:
+            return score + ply
+        if score < -MATE_BOUND:
+            return score - ply
+        return score
+
+    def _score_from_table(self, score: int, ply: int) -> int:
+        if score > MATE_BOUND:
+            return score - ply
+        if score < -MATE_BOUND:
+            return score + ply
+        return score
+
+    def _evaluate(self, board: Board) -> int:
+        value = self.evaluator.evaluate_current_position(board)
+        return value if board.color_to_move == util.PlayerColor.White else -value
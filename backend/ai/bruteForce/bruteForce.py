@@ -2,6 +2,7 @@ from ..ai import Ai
 from ...positionEvaluator.posititionEvaluator import PositionEvaluator
 from ...chess import util
 from ...chess import Board
+from ...chess import move
 
 
 
@@ -22,31 +23,28 @@ class BruteForce(Ai):
     def get_move(self) -> tuple[str]:
         """Returns tuple of two strings: tuple[0] start pos, tuple[1] target pos"""
         self.moves = list()
-        self._calc(self.board.get_copy())
+        self.current_depth = 0
+        self._calc(self.board)
         return self.best_variant
     
     def _calc(self, board: Board) -> list[dict]:
-        pieces = board.get_pieces(self.board.color_to_move)
-        self.moveCalculator.calc_all_valid_moves(pieces)
-        for piece in pieces:
-            possible_moves = self.moveCalculator.get_possible_moves(piece=piece)
-            for variant in possible_moves:
-                start_pos = piece.pos
-                board.handle_move(start_pos, variant)
-                    
-                if len(self.moves) == self.current_depth:
-                    self.moves.append((start_pos, variant))
-                else:
-                    self.moves[self.current_depth] = (start_pos, variant)
-                    
-                self.current_depth += 1
-                if self.current_depth < self.max_depth * 2:
-                    
-                    self._calc(board)
-                else:
-                    value = self._evalue_variant(board)
-                    if value > self.best_variant_value or self.best_variant is None:
-                        self.best_variant = self.moves[0]
+        for variant in self.moveCalculator.generate_moves(board):
+            undo = board.make_move(variant)
+                
+            if len(self.moves) == self.current_depth:
+                self.moves.append(move.to_positions(variant))
+            else:
+                self.moves[self.current_depth] = move.to_positions(variant)
+                
+            self.current_depth += 1
+            if self.current_depth < self.max_depth * 2:
+                self._calc(board)
+            else:
+                value = self._evalue_variant(board)
+                if value > self.best_variant_value or self.best_variant is None:
+                    self.best_variant = self.moves[0]
+            self.current_depth -= 1
+            board.unmake_move(undo)
                 
     def _evalue_variant(self, board) -> int:
         value = self.evaluator.evaluate_current_position(board)
@@ -0,0 +1,110 @@
+from ..chess import Board
+from ..chess import bitboard
+from ..moveCalculation.moveCalculator import MoveCalculator
+from ..moveCalculation.moveCalculator import GenerationMode
+
+MAX_PLY = 128
+KILLER_SLOTS = 2
+HISTORY_LIMIT = 1 << 20 # history scores are halved when one gets this big, so old knowledge fades
+
+
+class MoveOrdering:
+    """Hands out the moves of a node best first, in stages:
+    hash move, captures (most valuable victim / least valuable attacker), killer moves, quiet moves by history.
+    Every stage is generated only when the one before did not cut the node off"""
+    def __init__(self, move_calculator: MoveCalculator):
+        self.move_calculator = move_calculator
+        self.killers: list[list[int]] = [[0] * KILLER_SLOTS for _ in range(MAX_PLY)]
+        self.history: list[list[int]] = [[0] * 64 for _ in range(12)] # [bitboard piece index][target square]
+
+    def clear(self) -> None:
+        """Forgets killers and history, for a search that must not depend on the ones before"""
+        self.killers = [[0] * KILLER_SLOTS for _ in range(MAX_PLY)]
+        self.history = [[0] * 64 for _ in range(12)]
+
+    def new_search(self) -> None:
+        """Killers are only valid for the position they were found in, history is kept but weighted down"""
+        self.killers = [[0] * KILLER_SLOTS for _ in range(MAX_PLY)]
+        for scores in self.history:
+            for square in range(64):
+                scores[square] >>= 2
+
+    def ordered_moves(self, board: Board, ply: int, hash_move: int = 0):
+        """Generator over all legal moves of board. The board must be in the node's position whenever the next move is requested"""
+        move_calculator = self.move_calculator
+        if hash_move and move_calculator.is_legal(board, hash_move):
+            yield hash_move
+
+        captures = move_calculator.generate_moves(board, GenerationMode.Captures)
+        if len(captures) > 1:
+            captures.sort(key=self._capture_score_function(board), reverse=True)
+        for capture in captures:
+            if capture != hash_move:
+                yield capture
+
+        killers = self.killers[ply]
+        for killer in killers:
+            if killer and killer != hash_move and self.is_quiet(board, killer) and move_calculator.is_legal(board, killer):
+                yield killer
+
+        quiets = move_calculator.generate_moves(board, GenerationMode.Quiets)
+        if len(quiets) > 1:
+            history = self.history
+            mailbox = board.mailbox
+            index = bitboard.piece_index
+            quiets.sort(key=lambda quiet: history[index(mailbox[quiet & 63].name, mailbox[quiet & 63].color)][quiet >> 6 & 63], reverse=True)
+        for quiet in quiets:
+            if quiet != hash_move and quiet not in killers:
+                yield quiet
+
+    def root_moves(self, board: Board, first: int = 0) -> list[int]:
+        """All legal moves, first (the best move of the last iteration) in front, then captures by MVV-LVA, then quiets.
+        Unlike ordered_moves this does not depend on killers or history, so every process of a parallel search sorts alike"""
+        captures = self.move_calculator.generate_moves(board, GenerationMode.Captures)
+        captures.sort(key=self._capture_score_function(board), reverse=True)
+        moves = captures + self.move_calculator.generate_moves(board, GenerationMode.Quiets)
+        if first in moves:
+            moves.remove(first)
+            moves.insert(0, first)
+        return moves
+
+    def ordered_captures(self, board: Board) -> list[int]:
+        """Captures and queen promotions, most valuable victim first. Underpromotions are left out"""
+        captures = [capture for capture in self.move_calculator.generate_moves(board, GenerationMode.Captures) if capture >> 12 in (0, bitboard.QUEEN)]
+        if len(captures) > 1:
+            captures.sort(key=self._capture_score_function(board), reverse=True)
+        return captures
+
+    def is_quiet(self, board: Board, candidate: int) -> bool:
+        target = candidate >> 6 & 63
+        if candidate >> 12 or board.occupied >> target & 1:
+            return False
+        piece = board.mailbox[candidate & 63]
+        return not (target == board.ep_square and piece is not None and bitboard.FIGURE_INDEX[piece.name] == bitboard.PAWN)
+
+    def update(self, board: Board, cutoff_move: int, ply: int, depth: int) -> None:
+        """Called when cutoff_move failed high. Quiet moves become killers and gain history"""
+        if not self.is_quiet(board, cutoff_move):
+            return
+        killers = self.killers[ply]
+        if killers[0] != cutoff_move:
+            killers[1] = killers[0]
+            killers[0] = cutoff_move
+        piece = board.mailbox[cutoff_move & 63]
+        scores = self.history[bitboard.piece_index(piece.name, piece.color)]
+        target = cutoff_move >> 6 & 63
+        scores[target] += depth * depth
+        if scores[target] > HISTORY_LIMIT:
+            for scores in self.history:
+                for square in range(64):
+                    scores[square] >>= 1
+
+    def _capture_score_function(self, board: Board):
+        mailbox = board.mailbox
+        figure_index = bitboard.FIGURE_INDEX
+        def score(capture: int) -> int:
+            attacker = figure_index[mailbox[capture & 63].name]
+            victim = mailbox[capture >> 6 & 63]
+            victim_value = figure_index[victim.name] + 1 if victim else 1 # empty target: en passant or quiet promotion
+            return victim_value * 8 - attacker + (capture >> 12) * 8
+        return score
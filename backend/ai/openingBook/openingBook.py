@@ -0,0 +1,137 @@
+"""Opening book: a sorted file of (position key, move, weight) entries, memory mapped and searched by bisection.
+
+python -m backend.ai.openingBook.openingBook build games.pgn [more.pgn ...] --out book.bin --plies 20
+python -m backend.ai.openingBook.openingBook probe book.bin --fen "<fen>"
+"""
+import argparse
+import mmap
+import os
+import random
+import struct
+import sys
+
+from ...chess import Board
+from ...chess import move
+from ...chess import bitboard
+from ...chess.board import START_FEN
+from ...moveCalculation.moveCalculator import MoveCalculator
+from ... import pgn
+from ... import san
+
+# Polyglot's 16 byte entry layout (big endian key, move, weight, learn), filled with our zobrist keys and move encoding
+ENTRY = struct.Struct(">QHHI")
+_KEY = struct.Struct(">Q")
+MAX_WEIGHT = 0xFFFF
+RESULT_POINTS = {"1-0": (2, 0), "0-1": (0, 2), "1/2-1/2": (1, 1)} # (White, Black), a won game counts twice a drawn one
+
+
+class OpeningBook:
+    """Read only view of a book file. Nothing is parsed up front, every lookup bisects the mapped file"""
+    def __init__(self, path: str, seed: int | None = None):
+        self.path = path
+        self.random = random.Random(seed)
+        self.move_calculator = MoveCalculator()
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size % ENTRY.size:
+            raise Exception(f"{path} is no opening book: size {size} is not a multiple of {ENTRY.size}")
+        self._entries = size // ENTRY.size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self) -> int:
+        return self._entries
+
+    def close(self) -> None:
+        if self._map:
+            self._map.close()
+        self._file.close()
+
+    def entries(self, key: int) -> list[tuple[int, int]]:
+        """(move, weight) stored for key"""
+        data = self._map
+        low, high = 0, self._entries
+        while low < high: # first entry with a key >= key
+            middle = (low + high) // 2
+            if _KEY.unpack_from(data, middle * ENTRY.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        found = list()
+        for index in range(low, self._entries):
+            entry_key, entry_move, weight, _ = ENTRY.unpack_from(data, index * ENTRY.size)
+            if entry_key != key:
+                break
+            found.append((entry_move, weight))
+        return found
+
+    def moves(self, board: Board) -> list[tuple[int, int]]:
+        """Legal book moves of board with their weights. Moves of other positions with the same key are dropped"""
+        return [(book_move, weight) for book_move, weight in self.entries(board.hash) if weight and self.move_calculator.is_legal(board, book_move)]
+
+    def choose_move(self, board: Board) -> int | None:
+        """A book move picked at random, more likely the higher its weight. None when board is out of book"""
+        moves = self.moves(board)
+        if not moves:
+            return None
+        return self.random.choices([book_move for book_move, _ in moves], weights=[weight for _, weight in moves])[0]
+
+
+def build_book(games, path: str, max_plies: int = 20, min_games: int = 1) -> int:
+    """Writes a book of the first max_plies plies of games (PgnGame). Moves played in fewer than min_games games are left out.
+    Returns the number of entries written"""
+    move_calculator = MoveCalculator()
+    counts: dict[tuple[int, int], list[int]] = dict() # (key, move) -> [games, points]
+    for game in games:
+        points = RESULT_POINTS.get(game.result, (0, 0))
+        board = Board.from_fen(game.headers.get("FEN", START_FEN))
+        for san_move in game.moves[:max_plies]:
+            try:
+                book_move = san.parse_san(board, san_move, move_calculator)
+            except Exception:
+                break # broken or unsupported movetext, keep what was read so far
+            entry = counts.setdefault((board.hash, book_move), [0, 0])
+            entry[0] += 1
+            entry[1] += points[bitboard.COLOR_INDEX[board.color_to_move]]
+            board.make_move(book_move)
+
+    entries = [(key, book_move, points) for (key, book_move), (played, points) in counts.items() if played >= min_games]
+    highest = max((points for _, _, points in entries), default=0)
+    scale = MAX_WEIGHT / highest if highest > MAX_WEIGHT else 1
+    entries.sort(key=lambda entry: (entry[0], -entry[2]))
+    with open(path, "wb") as file:
+        for key, book_move, points in entries:
+            file.write(ENTRY.pack(key, book_move, max(1, int(points * scale)) if points else 0, 0))
+    return len(entries)
+
+def build_book_from_pgn(pgn_paths: list[str], path: str, max_plies: int = 20, min_games: int = 1) -> int:
+    def games():
+        for pgn_path in pgn_paths:
+            yield from pgn.open_games(pgn_path)
+    return build_book(games(), path, max_plies, min_games)
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Build or query an opening book")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="build a book from PGN files")
+    build.add_argument("pgn", nargs="+")
+    build.add_argument("--out", required=True, help="book file to write")
+    build.add_argument("--plies", type=int, default=20, help="plies of every game that go into the book")
+    build.add_argument("--min-games", type=int, default=1, help="leave out moves played in fewer games")
+    probe = commands.add_parser("probe", help="list the book moves of a position")
+    probe.add_argument("book")
+    probe.add_argument("--fen", default=START_FEN)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        entries = build_book_from_pgn(args.pgn, args.out, args.plies, args.min_games)
+        print(f"{entries} entries written to {args.out}")
+        return 0
+    book = OpeningBook(args.book)
+    for book_move, weight in sorted(book.moves(Board.from_fen(args.fen)), key=lambda entry: -entry[1]):
+        print(f"{move.to_uci(book_move)} {weight}")
+    book.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
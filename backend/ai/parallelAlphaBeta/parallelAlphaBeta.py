@@ -0,0 +1,187 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+
+from ..ai import SearchResult
+from ..ai import MATE_SCORE
+from ..searchStats import SearchStats
+from ..alphaBeta.alphaBeta import AlphaBeta, INFINITY, MATE_BOUND
+from ...chess import util
+from ...chess import Board
+from ...bitbases.bitbases import Bitbases
+
+POLL_SECONDS = 0.01 # how often the main process looks at the time limit and stop requests while workers search
+
+_worker: "_RootWorker | None" = None # the search of a pool process, created by _init_worker
+
+
+class _RootWorker(AlphaBeta):
+    """Searches single root moves for ParallelAlphaBeta. Lives as long as its process, so the tables carry over between tasks"""
+    def __init__(self, shared_best, shared_stop, hash_mb: float, bitbase_directory: str | None) -> None:
+        super().__init__(Board(), hash_mb=hash_mb)
+        if bitbase_directory is not None:
+            self.evaluator.bitbases = Bitbases(bitbase_directory)
+        self.shared_best = shared_best
+        self.shared_stop = shared_stop
+        self._search_id = -1
+
+    def search_root_move(self, packed: tuple[int, ...], root_move: int, index: int, depth: int, search_id: int, may_stop: bool,
+                         collect_stats: bool) -> tuple[int | None, list[int], int, dict | None]:
+        """Returns (score, pv, nodes, stats) of the root move at index, score None if the search was stopped,
+        stats the SearchStats.as_dict of this task if collect_stats.
+        Equal scores go to the earlier root move, so a move behind the best so far only has to be proven no better,
+        a move before it no worse. Everything that could become the best gets its exact score"""
+        if search_id != self._search_id:
+            self._search_id = search_id
+            self.transposition_table.new_search()
+            self.move_ordering.new_search()
+        board = Board.from_packed(packed)
+        self.nodes = 0
+        self._stopped = False
+        self._completed_depth = 1 if may_stop else 0
+        self._pv = [list() for _ in range(depth + 1)]
+        with self.shared_best.get_lock():
+            best_score, best_index = self.shared_best
+        alpha = best_score if index > best_index else best_score - 1
+        stats = SearchStats() if collect_stats else None
+        if stats:
+            stats.attach(self, board)
+        try:
+            undo = board.make_move(root_move)
+            score = -self._negamax(board, depth - 1, -INFINITY, -alpha, 1)
+            board.unmake_move(undo)
+        finally:
+            if stats:
+                stats.detach(self.nodes)
+        counters = stats.as_dict() if stats else None
+        if self._stopped:
+            return None, list(), self.nodes, counters
+        if score > alpha:
+            with self.shared_best.get_lock():
+                best_score, best_index = self.shared_best
+                if score > best_score or score == best_score and index < best_index:
+                    self.shared_best[:] = [score, index]
+        return score, [root_move] + self._pv[1], self.nodes, counters
+
+    def _check_limits(self) -> None:
+        if self._completed_depth and self.shared_stop.value:
+            self._stopped = True
+
+def _init_worker(shared_best, shared_stop, hash_mb: float, bitbase_directory: str | None) -> None:
+    global _worker
+    _worker = _RootWorker(shared_best, shared_stop, hash_mb, bitbase_directory)
+
+def _search_root_move(packed: tuple[int, ...], root_move: int, index: int, depth: int, search_id: int, may_stop: bool,
+                      collect_stats: bool) -> tuple[int | None, list[int], int, dict | None]:
+    return _worker.search_root_move(packed, root_move, index, depth, search_id, may_stop, collect_stats)
+
+
+class ParallelAlphaBeta(AlphaBeta):
+    """AlphaBeta with the root moves of every iteration split across a process pool.
+    The first root move is searched alone, its score becomes the shared alpha (with the index of its move) the other moves are searched against.
+    Root moves are sorted as in the single process search and equal scores go to the earlier move,
+    so at a fixed depth both return the same move. Every worker has its own transposition table of hash_mb"""
+    def __init__(self, board: Board, color: util.PlayerColor = util.PlayerColor.Black, depth: int = 4, hash_mb: float = 16, workers: int | None = None) -> None:
+        super().__init__(board, color, depth, hash_mb)
+        self.workers = workers or os.cpu_count() or 1
+        self._pool: ProcessPoolExecutor | None = None
+        self._shared_best = None
+        self._shared_stop = None
+        self._search_id = 0
+
+    def close(self) -> None:
+        """Shuts the worker processes down. The next search starts new ones"""
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def search(self, board: Board, depth: int, time_limit: float | None = None, node_limit: int | None = None) -> SearchResult:
+        """Iterative deepening like AlphaBeta.search, depth 1 always completes. Limits are checked by the main process, workers see them through a shared stop flag.
+        With collect_stats the workers collect stats for every root move they search, the result's stats add them up"""
+        book_result = self._book_result(board)
+        if book_result:
+            return book_result
+        start = time.perf_counter()
+        self._start_pool()
+        self.nodes = 0
+        self._stop_requested = False
+        self._deadline = start + time_limit if time_limit is not None else None
+        self._budget_start = start
+        self._node_limit = node_limit
+        self._completed_depth = 0
+        packed = board.pack()
+        stats = SearchStats() if self.collect_stats else None
+        if stats:
+            stats.start()
+        result = None
+        for iteration_depth in range(1, max(depth, 1) + 1):
+            root_moves = self.move_ordering.root_moves(board, result.move if result else 0)
+            if not root_moves:
+                result = SearchResult(None, -MATE_SCORE if self.moveCalculator.in_check(board) else 0, list(), iteration_depth, self.nodes, stats)
+                break
+            outcome = self._search_iteration(packed, root_moves, iteration_depth, stats)
+            if outcome is None:
+                break
+            score, pv = outcome
+            if stats:
+                stats.end_iteration(iteration_depth, self.nodes)
+            result = SearchResult(pv[0], score, pv, iteration_depth, self.nodes, stats)
+            self._completed_depth = iteration_depth
+            if self.on_iteration:
+                self.on_iteration(result)
+            if self._stop_requested:
+                break
+            if abs(score) > MATE_BOUND:
+                break
+            if self._no_time_for_next_iteration():
+                break
+            if self._node_limit is not None and self.nodes >= self._node_limit:
+                break
+        if stats:
+            stats.detach(self.nodes)
+        return result._replace(nodes=self.nodes)
+
+    def _start_pool(self) -> None:
+        if self._pool is not None:
+            return
+        context = multiprocessing.get_context()
+        self._shared_best = context.Array("i", [-INFINITY, 0]) # score and root move index of the best move so far
+        self._shared_stop = context.Value("b", 0)
+        bitbases = self.evaluator.bitbases
+        self._pool = ProcessPoolExecutor(self.workers, mp_context=context, initializer=_init_worker,
+                                         initargs=(self._shared_best, self._shared_stop, self.transposition_table.size_mb, bitbases.directory if bitbases else None))
+
+    def _search_iteration(self, packed: tuple[int, ...], root_moves: list[int], depth: int, stats: SearchStats | None) -> tuple[int, list[int]] | None:
+        """Searches all root moves to depth. Returns (score, pv) of the best, None if the iteration was stopped"""
+        self._search_id += 1
+        self._shared_best[:] = [-INFINITY, len(root_moves)]
+        self._shared_stop.value = 0
+        may_stop = self._completed_depth > 0
+        submit = lambda index: self._pool.submit(_search_root_move, packed, root_moves[index], index, depth, self._search_id, may_stop, stats is not None)
+        results: dict[int, tuple[int, list[int]]] = dict()
+        pending: dict[Future, int] = {submit(0): 0}
+        while pending:
+            done, _ = wait(pending, timeout=POLL_SECONDS, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                score, pv, nodes, counters = future.result()
+                self.nodes += nodes
+                if counters:
+                    stats.add(counters)
+                if score is not None:
+                    results[index] = (score, pv)
+                if index == 0:
+                    pending.update({submit(later): later for later in range(1, len(root_moves))})
+            if may_stop and self._limit_reached():
+                self._shared_stop.value = 1
+                for future in pending:
+                    future.cancel()
+                wait(pending)
+                return None
+        index = max(results, key=lambda index: (results[index][0], -index))
+        return results[index]
+
+    def _limit_reached(self) -> bool:
+        return (self._stop_requested or self._deadline is not None and time.perf_counter() >= self._deadline
+                or self._node_limit is not None and self.nodes >= self._node_limit)
@@ -0,0 +1,79 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+
+from .ai import SearchLimits
+from .ai import SearchResult
+from ..chess import Board
+
+
+class SearchHandle:
+    """A search running in a background thread, started by AlphaBeta.start_search.
+    Await it in asyncio code or call result() to block. Either gives the SearchResult once the search ends"""
+    def __init__(self, ai, board: Board, depth: int, limits: SearchLimits, ponder_move: int = 0) -> None:
+        self.ai = ai
+        self.board = board.get_copy() # the caller may play on its board while this one is searched
+        if ponder_move:
+            self.board.make_move(ponder_move)
+        self.ponder_move = ponder_move
+        self.depth = depth
+        self.limits = limits
+        self._current: SearchResult | None = None
+        self._stop_requested = False
+        self._ponderhit_at: float | None = None # time.perf_counter() of ponderhit
+        self._future: Future = Future()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def __await__(self):
+        return asyncio.wrap_future(self._future).__await__()
+
+    @property
+    def pondering(self) -> bool:
+        return bool(self.ponder_move) and self.limits.time_limit is None
+
+    @property
+    def current_result(self) -> SearchResult | None:
+        """Result of the last completed iteration, None before depth 1 is done"""
+        return self._current
+
+    def best_move(self) -> int | None:
+        return self._current.move if self._current else None
+
+    def done(self) -> bool:
+        return self._future.done()
+
+    def result(self, timeout: float | None = None) -> SearchResult:
+        return self._future.result(timeout)
+
+    def stop(self) -> None:
+        """Ends the search as soon as depth 1 is done, the result is the last completed iteration"""
+        self._stop_requested = True
+        self.ai.stop()
+
+    def ponderhit(self, time_limit: float) -> None:
+        """The opponent played the ponder move: the search goes on as a normal search with time_limit seconds from now"""
+        self._ponderhit_at = time.perf_counter()
+        self.limits = self.limits._replace(time_limit=time_limit)
+        self.ai.set_time_limit(time_limit, self._ponderhit_at)
+
+    def _run(self) -> None:
+        callback = self.ai.on_iteration
+        def on_iteration(result: SearchResult) -> None:
+            self._current = result
+            if self._stop_requested: # stop() came before the search had started and reset the stop request
+                self.ai.stop()
+            if self._ponderhit_at is not None: # likewise a ponderhit whose time limit the starting search cleared
+                self.ai.set_time_limit(self.limits.time_limit, self._ponderhit_at)
+            if callback:
+                callback(result)
+        self.ai.on_iteration = on_iteration
+        try:
+            result = self.ai.search(self.board, self.depth, self.limits.time_limit, self.limits.node_limit)
+        except Exception as error:
+            self._future.set_exception(error)
+            return
+        finally:
+            self.ai.on_iteration = callback
+        self._future.set_result(result)
@@ -0,0 +1,165 @@
+import time
+
+CUTOFF_SLOTS = 8 # cutoffs are counted per index of the move that caused them, the last slot takes every later move
+
+
+class SearchStats:
+    """Counters and timers of one search.
+    They are collected by wrapping the methods the search calls for as long as it runs (attach / detach),
+    so a search without stats runs the plain methods and pays nothing"""
+    def __init__(self):
+        self.nodes = 0 # all nodes, quiescence nodes included
+        self.quiescence_nodes = 0
+        self.seconds = 0.0
+        self.cutoffs: list[int] = [0] * CUTOFF_SLOTS # beta cutoffs by index of the cutting move (0 = first move tried)
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.depth_seconds: list[float] = list() # time of each completed iteration
+        self.depth_nodes: list[int] = list()
+        self.seldepth = 0 # deepest ply reached, quiescence included
+        self.movegen_seconds = 0.0
+        self.eval_seconds = 0.0
+        self.make_unmake_seconds = 0.0 # playing and taking back moves, what copying the board used to cost
+        self.pawn_probes = 0
+        self.pawn_hits = 0
+        self._evaluator = None
+        self._evaluator_start: dict = dict() # evaluator.stats() when the search started
+        self._start = 0.0
+        self._wrapped: list[tuple[object, str]] = list()
+
+    @property
+    def nps(self) -> float:
+        return self.nodes / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def tt_hit_rate(self) -> float:
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    @property
+    def first_move_cutoff_rate(self) -> float:
+        """Share of cutoffs caused by the first move tried, a measure of move ordering"""
+        total = sum(self.cutoffs)
+        return self.cutoffs[0] / total if total else 0.0
+
+    @property
+    def pawn_hit_rate(self) -> float:
+        return self.pawn_hits / self.pawn_probes if self.pawn_probes else 0.0
+
+    def as_dict(self) -> dict:
+        return {"nodes": self.nodes, "quiescence_nodes": self.quiescence_nodes, "seconds": self.seconds, "nps": self.nps,
+                "cutoffs": list(self.cutoffs), "tt_probes": self.tt_probes, "tt_hits": self.tt_hits,
+                "depth_seconds": list(self.depth_seconds), "depth_nodes": list(self.depth_nodes), "seldepth": self.seldepth,
+                "movegen_seconds": self.movegen_seconds, "eval_seconds": self.eval_seconds, "make_unmake_seconds": self.make_unmake_seconds,
+                "pawn_probes": self.pawn_probes, "pawn_hits": self.pawn_hits}
+
+    def report(self) -> str:
+        lines = [f"nodes {self.nodes} (quiescence {self.quiescence_nodes})  {self.seconds:.2f}s  {self.nps:.0f} nps  seldepth {self.seldepth}",
+                 f"tt hits {self.tt_hits}/{self.tt_probes} ({self.tt_hit_rate:.1%})  first move cutoffs {self.first_move_cutoff_rate:.1%}  cutoffs by move {self.cutoffs}",
+                 f"movegen {self.movegen_seconds:.2f}s  eval {self.eval_seconds:.2f}s  make/unmake {self.make_unmake_seconds:.2f}s",
+                 f"pawn hits {self.pawn_hits}/{self.pawn_probes} ({self.pawn_hit_rate:.1%})"]
+        for depth, (seconds, nodes) in enumerate(zip(self.depth_seconds, self.depth_nodes), start=1):
+            lines.append(f"depth {depth:>2}  {seconds:7.3f}s  {nodes:>9} nodes")
+        return "\n".join(lines)
+
+    def start(self) -> None:
+        """Starts the clock. attach does this, a search that only adds up counters of others (see add) calls it itself"""
+        self._start = time.perf_counter()
+
+    def add(self, counters: dict) -> None:
+        """Adds the counters of another search (its as_dict), e.g. of a worker process searching part of the tree.
+        Nodes and times per iteration are left to end_iteration, the seconds spent in methods add up over the workers"""
+        self.quiescence_nodes += counters["quiescence_nodes"]
+        self.cutoffs = [mine + theirs for mine, theirs in zip(self.cutoffs, counters["cutoffs"])]
+        self.tt_probes += counters["tt_probes"]
+        self.tt_hits += counters["tt_hits"]
+        self.seldepth = max(self.seldepth, counters["seldepth"])
+        self.movegen_seconds += counters["movegen_seconds"]
+        self.eval_seconds += counters["eval_seconds"]
+        self.make_unmake_seconds += counters["make_unmake_seconds"]
+        self.pawn_probes += counters["pawn_probes"]
+        self.pawn_hits += counters["pawn_hits"]
+
+    def attach(self, ai, board) -> None:
+        """Starts collecting for a search of ai (an AlphaBeta) on board"""
+        self.start()
+        self._evaluator = ai.evaluator
+        self._evaluator_start = ai.evaluator.stats()
+        self._time(ai.moveCalculator, "generate_moves", "movegen_seconds")
+        self._time(ai.moveCalculator, "in_check", "movegen_seconds")
+        self._time(ai.evaluator, "evaluate_current_position", "eval_seconds")
+        self._time(board, "make_move", "make_unmake_seconds")
+        self._time(board, "unmake_move", "make_unmake_seconds")
+
+        probe = ai.transposition_table.probe
+        def counted_probe(key):
+            entry = probe(key)
+            self.tt_probes += 1
+            if entry is not None:
+                self.tt_hits += 1
+            return entry
+        self._wrap(ai.transposition_table, "probe", counted_probe)
+
+        quiescence = ai._quiescence
+        def counted_quiescence(board, alpha, beta, ply):
+            self.quiescence_nodes += 1
+            if ply > self.seldepth:
+                self.seldepth = ply
+            return quiescence(board, alpha, beta, ply)
+        self._wrap(ai, "_quiescence", counted_quiescence)
+
+        ordered_moves = ai.move_ordering.ordered_moves
+        update = ai.move_ordering.update
+        tried: dict[int, int] = dict() # ply -> moves handed out so far in the node being searched at that ply
+        def counted_ordered_moves(board, ply, hash_move=0):
+            tried[ply] = 0
+            for variant in ordered_moves(board, ply, hash_move):
+                tried[ply] += 1
+                yield variant
+        def counted_update(board, cutoff_move, ply, depth):
+            # the root loops over ai._root_moves without asking ordered_moves, so its index is looked up there
+            index = ai._root_moves.index(cutoff_move) + 1 if ply == 0 else tried[ply]
+            self.cutoffs[min(index, CUTOFF_SLOTS) - 1] += 1
+            return update(board, cutoff_move, ply, depth)
+        self._wrap(ai.move_ordering, "ordered_moves", counted_ordered_moves)
+        self._wrap(ai.move_ordering, "update", counted_update)
+
+    def end_iteration(self, depth: int, nodes: int) -> None:
+        self.seconds = time.perf_counter() - self._start
+        self.depth_seconds.append(self.seconds - sum(self.depth_seconds))
+        self.depth_nodes.append(nodes - sum(self.depth_nodes))
+        self.nodes = nodes
+        self.seldepth = max(self.seldepth, depth)
+        self._read_evaluator()
+
+    def detach(self, nodes: int) -> None:
+        """Stops collecting and puts the wrapped methods back"""
+        self.seconds = time.perf_counter() - self._start
+        self.nodes = nodes
+        self._read_evaluator()
+        self._evaluator = None
+        for owner, name in self._wrapped:
+            delattr(owner, name)
+        self._wrapped = list()
+
+    def _read_evaluator(self) -> None:
+        """Evaluator counters since attach"""
+        if self._evaluator is None:
+            return
+        counters = self._evaluator.stats()
+        self.pawn_probes = counters["pawn_probes"] - self._evaluator_start["pawn_probes"]
+        self.pawn_hits = counters["pawn_hits"] - self._evaluator_start["pawn_hits"]
+
+    def _wrap(self, owner: object, name: str, wrapper) -> None:
+        setattr(owner, name, wrapper) # the instance attribute hides the method until detach deletes it
+        self._wrapped.append((owner, name))
+
+    def _time(self, owner: object, name: str, counter: str) -> None:
+        method = getattr(owner, name)
+        perf_counter = time.perf_counter
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                setattr(self, counter, getattr(self, counter) + perf_counter() - start)
+        self._wrap(owner, name, timed)
@@ -0,0 +1,95 @@
+from array import array
+
+# Bound types
+EXACT = 0
+LOWER = 1 # score >= stored score (fail high)
+UPPER = 2 # score <= stored score (fail low)
+
+ENTRY_BYTES = 16 # 8 byte key + 8 byte packed data
+BUCKET_SIZE = 2 # slot 0: depth preferred, slot 1: always replace
+
+# Data word layout, lowest bits first
+_MOVE_BITS  = 16
+_SCORE_BITS = 21
+_DEPTH_BITS = 8
+_BOUND_BITS = 2
+_AGE_BITS   = 6
+_SCORE_SHIFT = _MOVE_BITS
+_DEPTH_SHIFT = _SCORE_SHIFT + _SCORE_BITS
+_BOUND_SHIFT = _DEPTH_SHIFT + _DEPTH_BITS
+_AGE_SHIFT   = _BOUND_SHIFT + _BOUND_BITS
+_SCORE_OFFSET = 1 << (_SCORE_BITS - 1) # scores are stored shifted to be positive, so a used slot is never 0
+_MOVE_MASK  = (1 << _MOVE_BITS) - 1
+_SCORE_MASK = (1 << _SCORE_BITS) - 1
+_DEPTH_MASK = (1 << _DEPTH_BITS) - 1
+_BOUND_MASK = (1 << _BOUND_BITS) - 1
+AGE_MASK    = (1 << _AGE_BITS) - 1
+
+
+class TranspositionTable:
+    """Fixed size hash table of search results keyed by zobrist key.
+    Entries live in two flat arrays (keys, packed data) instead of Python objects, so the memory budget holds"""
+    def __init__(self, size_mb: float = 16):
+        self.age = 0
+        self.resize(size_mb)
+
+    def resize(self, size_mb: float) -> None:
+        entries = max(BUCKET_SIZE, int(size_mb * 1024 * 1024) // ENTRY_BYTES)
+        buckets = 1 << ((entries // BUCKET_SIZE).bit_length() - 1) # power of two, so the index is a mask
+        self._bucket_mask = buckets - 1
+        self._keys = array("Q", bytes(8 * buckets * BUCKET_SIZE))
+        self._data = array("Q", bytes(8 * buckets * BUCKET_SIZE))
+
+    @property
+    def size_mb(self) -> float:
+        return len(self._keys) * ENTRY_BYTES / (1024 * 1024)
+
+    def clear(self) -> None:
+        self.resize(self.size_mb)
+        self.age = 0
+
+    def new_search(self) -> None:
+        """Call once per move searched. Entries of earlier searches become the first to be replaced"""
+        self.age = (self.age + 1) & AGE_MASK
+
+    def probe(self, key: int) -> tuple[int, int, int, int] | None:
+        """Returns (depth, bound, score, move) stored for key or None. move 0 means no move stored"""
+        index = (key & self._bucket_mask) * BUCKET_SIZE
+        keys = self._keys
+        if keys[index] == key:
+            data = self._data[index]
+        elif keys[index + 1] == key:
+            data = self._data[index + 1]
+        else:
+            return None
+        if not data:
+            return None
+        return (data >> _DEPTH_SHIFT & _DEPTH_MASK, data >> _BOUND_SHIFT & _BOUND_MASK,
+                (data >> _SCORE_SHIFT & _SCORE_MASK) - _SCORE_OFFSET, data & _MOVE_MASK)
+
+    def store(self, key: int, depth: int, bound: int, score: int, move: int) -> None:
+        index = (key & self._bucket_mask) * BUCKET_SIZE
+        keys = self._keys
+        data = self._data
+        if keys[index] == key:
+            slot = index
+        elif keys[index + 1] == key:
+            slot = index + 1
+        else:
+            old = data[index]
+            protected = (old >> _AGE_SHIFT & AGE_MASK) == self.age and (old >> _DEPTH_SHIFT & _DEPTH_MASK) > depth
+            slot = index + 1 if old and protected else index
+        if not move and keys[slot] == key: # a fail low has no best move, keep the one we know
+            move = data[slot] & _MOVE_MASK
+        keys[slot] = key
+        data[slot] = (move & _MOVE_MASK
+                      | (score + _SCORE_OFFSET) << _SCORE_SHIFT
+                      | min(depth, _DEPTH_MASK) << _DEPTH_SHIFT
+                      | bound << _BOUND_SHIFT
+                      | self.age << _AGE_SHIFT)
+
+    def usage(self, sample: int = 1000) -> float:
+        """Share of used slots of the current search in the first sample slots"""
+        sample = min(sample, len(self._data))
+        used = sum(1 for data in self._data[:sample] if data and (data >> _AGE_SHIFT & AGE_MASK) == self.age)
+        return used / sample
@@ -0,0 +1,238 @@
+"""Endgame bitbases: won or drawn for every position of king and queen, rook or pawn against the bare king.
+
+python -m backend.bitbases.bitbases generate [--directory DIR]
+python -m backend.bitbases.bitbases bench [--directory DIR]
+"""
+import argparse
+import mmap
+import os
+import random
+import sys
+import time
+from collections import deque
+
+from ..chess import Board
+from ..chess import bitboard
+from ..moveCalculation import attackTables as tables
+from ..moveCalculation.sliderAttacks import rook_attacks, bishop_attacks
+
+DEFAULT_DIRECTORY = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "chessSim", "bitbases")
+ENDINGS = {"kqk": bitboard.QUEEN, "krk": bitboard.ROOK, "kpk": bitboard.PAWN} # in generation order, kpk promotes into the others
+ENDING_OF_FIGURE = {figure: name for name, figure in ENDINGS.items()}
+# Positions are indexed as side to move (0: the side with the piece) | white king << 12 | black king << 6 | piece,
+# always with the piece on White's side. One bit per position, set if the side with the piece wins
+POSITIONS = 2 << 18
+FILE_BYTES = POSITIONS // 8
+STRONG_TO_MOVE = 0
+WEAK_TO_MOVE = 1 << 18
+
+WIN = 1
+DRAW = 0
+LOSS = -1
+
+
+def position_index(weak_to_move: bool, white_king: int, black_king: int, piece: int) -> int:
+    return (WEAK_TO_MOVE if weak_to_move else STRONG_TO_MOVE) | white_king << 12 | black_king << 6 | piece
+
+def _piece_attacks(figure: int, square: int, occupied: int) -> int:
+    if figure == bitboard.PAWN:
+        return tables.PAWN_ATTACKS[bitboard.WHITE][square]
+    attacks = 0
+    if figure != bitboard.BISHOP:
+        attacks |= rook_attacks(square, occupied)
+    if figure != bitboard.ROOK:
+        attacks |= bishop_attacks(square, occupied)
+    return attacks
+
+def _piece_squares(figure: int) -> range:
+    return range(8, 56) if figure == bitboard.PAWN else range(64)
+
+def generate(figure: int, promotions: dict[int, bytearray] | None = None) -> bytearray:
+    """Retrograde analysis of king and figure against king. Pawns need the queen and rook bitbases in promotions.
+    Starting from the mates (and for pawns the won promotions), wins are spread backwards:
+    a position with the strong side to move is won if one move reaches a won position,
+    one with the weak side to move once every move of the weak king does"""
+    won = bytearray(POSITIONS)
+    weak_moves_left = bytearray(POSITIONS)
+    queue = deque()
+    king_attacks = tables.KING_ATTACKS
+    piece_squares = _piece_squares(figure)
+
+    # Count the moves of the bare king, find the mates and the won promotions
+    for white_king in range(64):
+        for piece in piece_squares:
+            if piece == white_king:
+                continue
+            guarded = _piece_attacks(figure, piece, 1 << white_king) | king_attacks[white_king] # x-rays through the black king
+            for black_king in range(64):
+                if black_king == white_king or black_king == piece or king_attacks[white_king] >> black_king & 1:
+                    continue
+                index = position_index(True, white_king, black_king, piece)
+                moves = bitboard.popcount(king_attacks[black_king] & ~guarded)
+                weak_moves_left[index] = moves
+                if not moves and guarded >> black_king & 1:
+                    won[index] = 1
+                    queue.append(index)
+            if figure == bitboard.PAWN and piece >= 48 and promotions:
+                target = piece + 8
+                for black_king in range(64):
+                    if black_king in (white_king, piece, target) or king_attacks[white_king] >> black_king & 1:
+                        continue
+                    if _piece_attacks(figure, piece, 0) >> black_king & 1:
+                        continue # black in check with White to move
+                    promoted = position_index(True, white_king, black_king, target)
+                    if any(bits[promoted >> 3] >> (promoted & 7) & 1 for bits in promotions.values()):
+                        index = position_index(False, white_king, black_king, piece)
+                        won[index] = 1
+                        queue.append(index)
+
+    while queue:
+        index = queue.popleft()
+        white_king = index >> 12 & 63
+        black_king = index >> 6 & 63
+        piece = index & 63
+        if index & WEAK_TO_MOVE:
+            # White moved into this won position: every White move that leads here wins the position before it
+            occupied = 1 << white_king | 1 << black_king | 1 << piece
+            for start in bitboard.iter_bits(king_attacks[white_king] & ~occupied & ~king_attacks[black_king]):
+                if not _piece_attacks(figure, piece, occupied & ~(1 << white_king) | 1 << start) >> black_king & 1:
+                    _mark_won(won, queue, position_index(False, start, black_king, piece))
+            for start in _piece_retreats(figure, piece, occupied):
+                if not _piece_attacks(figure, start, occupied & ~(1 << piece) | 1 << start) >> black_king & 1:
+                    _mark_won(won, queue, position_index(False, white_king, black_king, start))
+        else:
+            # Black moved into this won position: one escape less for the position before it
+            for start in bitboard.iter_bits(king_attacks[black_king] & ~king_attacks[white_king] & ~(1 << piece)):
+                previous = position_index(True, white_king, start, piece)
+                if won[previous]:
+                    continue
+                weak_moves_left[previous] -= 1
+                if not weak_moves_left[previous]:
+                    won[previous] = 1
+                    queue.append(previous)
+    return _pack(won)
+
+def _piece_retreats(figure: int, piece: int, occupied: int) -> list[int]:
+    """Squares the piece on piece can have come from with a quiet move"""
+    if figure != bitboard.PAWN:
+        return list(bitboard.iter_bits(_piece_attacks(figure, piece, occupied) & ~occupied))
+    retreats = list()
+    if piece >= 16 and not occupied >> (piece - 8) & 1:
+        retreats.append(piece - 8)
+        if 24 <= piece < 32 and not occupied >> (piece - 16) & 1:
+            retreats.append(piece - 16)
+    return retreats
+
+def _mark_won(won: bytearray, queue: deque, index: int) -> None:
+    if not won[index]:
+        won[index] = 1
+        queue.append(index)
+
+def _pack(won: bytearray) -> bytearray:
+    packed = bytearray(FILE_BYTES)
+    for byte in range(FILE_BYTES):
+        bits = 0
+        for bit, value in enumerate(won[byte * 8: byte * 8 + 8]):
+            bits |= value << bit
+        packed[byte] = bits
+    return packed
+
+def generate_all(directory: str = DEFAULT_DIRECTORY, report=print) -> None:
+    os.makedirs(directory, exist_ok=True)
+    generated = dict()
+    for name, figure in ENDINGS.items():
+        start = time.perf_counter()
+        promotions = {ENDINGS[other]: generated[other] for other in ("kqk", "krk")} if figure == bitboard.PAWN else None
+        generated[name] = generate(figure, promotions)
+        with open(os.path.join(directory, f"{name}.bb"), "wb") as file:
+            file.write(generated[name])
+        if report:
+            wins = sum(bitboard.popcount(byte) for byte in generated[name])
+            report(f"{name}: {wins} won positions  {time.perf_counter() - start:.1f}s")
+
+
+class Bitbases:
+    """Probes the bitbase files of a directory, memory mapped. Endings without a file are not probed"""
+    def __init__(self, directory: str = DEFAULT_DIRECTORY):
+        self.directory = directory
+        self._maps: dict[int, mmap.mmap] = dict()
+        for name, figure in ENDINGS.items():
+            path = os.path.join(directory, f"{name}.bb")
+            if not os.path.exists(path):
+                continue
+            with open(path, "rb") as file:
+                if os.fstat(file.fileno()).st_size != FILE_BYTES:
+                    raise Exception(f"{path} is no bitbase, expected {FILE_BYTES} bytes")
+                self._maps[figure] = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __bool__(self) -> bool:
+        return bool(self._maps)
+
+    def close(self) -> None:
+        for bits in self._maps.values():
+            bits.close()
+        self._maps = dict()
+
+    def probe(self, board: Board) -> int | None:
+        """WIN, DRAW or LOSS for the side to move, None if the position is not covered"""
+        if bitboard.popcount(board.occupied) != 3 or board.castling:
+            return None
+        bitboards = board.bitboards
+        for strong in (bitboard.WHITE, bitboard.BLACK):
+            for figure, bits in self._maps.items():
+                pieces = bitboards[strong * 6 + figure]
+                if not pieces:
+                    continue
+                white_king = bitboard.lsb(bitboards[strong * 6 + bitboard.KING])
+                black_king = bitboard.lsb(bitboards[(strong ^ 1) * 6 + bitboard.KING])
+                piece = bitboard.lsb(pieces)
+                weak_to_move = bitboard.COLOR_INDEX[board.color_to_move] != strong
+                if strong == bitboard.BLACK: # mirror the ranks, so the piece is White's
+                    white_king, black_king, piece = white_king ^ 56, black_king ^ 56, piece ^ 56
+                index = position_index(weak_to_move, white_king, black_king, piece)
+                if not bits[index >> 3] >> (index & 7) & 1:
+                    return DRAW
+                return LOSS if weak_to_move else WIN
+        return None
+
+
+def benchmark(directory: str = DEFAULT_DIRECTORY, probes: int = 100_000, report=print) -> None:
+    """Times generating every bitbase and probing random positions of each"""
+    generate_all(directory, report)
+    bases = Bitbases(directory)
+    rng = random.Random(0)
+    for name, figure in ENDINGS.items():
+        boards = list()
+        while len(boards) < 1000:
+            squares = rng.sample(list(_piece_squares(figure)), 1) + rng.sample(range(64), 2)
+            piece, white_king, black_king = squares
+            if len(set(squares)) < 3 or tables.KING_ATTACKS[white_king] >> black_king & 1:
+                continue
+            placement = ["1"] * 64
+            placement[white_king], placement[black_king] = "K", "k"
+            placement[piece] = "PNBRQK"[figure]
+            ranks = ["".join(placement[rank * 8: rank * 8 + 8]) for rank in reversed(range(8))]
+            boards.append(Board.from_fen(f"{'/'.join(ranks)} {rng.choice('wb')} - - 0 1"))
+        start = time.perf_counter()
+        for probe in range(probes):
+            bases.probe(boards[probe % len(boards)])
+        seconds = time.perf_counter() - start
+        if report:
+            report(f"{name}: {probes} probes  {seconds:.2f}s  {probes / seconds:.0f} probes/s")
+    bases.close()
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate and benchmark endgame bitbases")
+    parser.add_argument("command", choices=["generate", "bench"])
+    parser.add_argument("--directory", default=DEFAULT_DIRECTORY)
+    parser.add_argument("--probes", type=int, default=100_000, help="bench: probes per ending")
+    args = parser.parse_args(argv)
+    if args.command == "generate":
+        generate_all(args.directory)
+    else:
+        benchmark(args.directory, args.probes)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
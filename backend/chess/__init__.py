@@ -1,5 +1,4 @@
 from .piece import Piece
-from .square import Square
 from .board import Board
 from .board_history import BoardHistory
 from .game import Game
\ No newline at end of file
@@ -0,0 +1,73 @@
+from .piece import Piece
+from . import util
+
+# Square index = y * 8 + x, so A1 = 0, H1 = 7, A8 = 56, H8 = 63
+
+FULL    = 0xFFFF_FFFF_FFFF_FFFF
+FILE_A  = 0x0101_0101_0101_0101
+FILE_H  = FILE_A << 7
+RANK_1  = 0xFF
+RANK_8  = RANK_1 << 56
+FILES   = [FILE_A << x for x in range(8)]
+RANKS   = [RANK_1 << (8 * y) for y in range(8)]
+
+WHITE = 0
+BLACK = 1
+COLOR_INDEX = {util.PlayerColor.White: WHITE, util.PlayerColor.Black: BLACK}
+COLORS = [util.PlayerColor.White, util.PlayerColor.Black]
+
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+FIGURES = [Piece.Figure.Pawn, Piece.Figure.Knight, Piece.Figure.Bishop, Piece.Figure.Rook, Piece.Figure.Queen, Piece.Figure.King]
+FIGURE_INDEX = {figure: index for index, figure in enumerate(FIGURES)}
+
+# Castling rights as a 4 bit mask
+WHITE_KINGSIDE  = 1
+WHITE_QUEENSIDE = 2
+BLACK_KINGSIDE  = 4
+BLACK_QUEENSIDE = 8
+ALL_CASTLING    = 15
+CASTLING_BIT = {
+    (util.PlayerColor.White, util.CastlingRight.KingSide)  : WHITE_KINGSIDE,
+    (util.PlayerColor.White, util.CastlingRight.QueenSide) : WHITE_QUEENSIDE,
+    (util.PlayerColor.Black, util.CastlingRight.KingSide)  : BLACK_KINGSIDE,
+    (util.PlayerColor.Black, util.CastlingRight.QueenSide) : BLACK_QUEENSIDE,
+}
+
+
+def piece_index(figure: str, color: str) -> int:
+    """Index into Board.bitboards: White pawn .. king = 0..5, Black pawn .. king = 6..11"""
+    return COLOR_INDEX[color] * 6 + FIGURE_INDEX[figure]
+
+def square_index(pos: tuple[int, int]) -> int:
+    return pos[1] * 8 + pos[0]
+
+def square_pos(index: int) -> tuple[int, int]:
+    return index & 7, index >> 3
+
+def to_index(square: str | tuple[int, int]) -> int:
+    if isinstance(square, str):
+        x, y = util.to_python_indecies(square)
+        return y * 8 + x
+    return square[1] * 8 + square[0]
+
+def popcount(bb: int) -> int:
+    return bb.bit_count()
+
+def lsb(bb: int) -> int:
+    """Index of the lowest set bit. bb must not be empty"""
+    return (bb & -bb).bit_length() - 1
+
+def iter_bits(bb: int):
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+# Castling rights that survive a move touching the square (king or rook leaving, rook being captured)
+CASTLING_KEEP = [ALL_CASTLING] * 64
+CASTLING_KEEP[4]  = ALL_CASTLING & ~(WHITE_KINGSIDE | WHITE_QUEENSIDE)
+CASTLING_KEEP[0]  = ALL_CASTLING & ~WHITE_QUEENSIDE
+CASTLING_KEEP[7]  = ALL_CASTLING & ~WHITE_KINGSIDE
+CASTLING_KEEP[60] = ALL_CASTLING & ~(BLACK_KINGSIDE | BLACK_QUEENSIDE)
+CASTLING_KEEP[56] = ALL_CASTLING & ~BLACK_QUEENSIDE
+CASTLING_KEEP[63] = ALL_CASTLING & ~BLACK_KINGSIDE
@@ -1,37 +1,141 @@
-from . import Square
 from . import Piece
 from . import util
+from . import bitboard
+from . import zobrist
+from ..positionEvaluator import pieceSquareTables as pst
 
 from copy import deepcopy
+from typing import NamedTuple
 import os
 
 DIMENSION = 8
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+_FEN_PIECES = {char: (char.lower(), Piece.Color.White if char.isupper() else Piece.Color.Black) for char in "PNBRQKpnbrqk"}
+_FEN_CASTLING = {"K": bitboard.WHITE_KINGSIDE, "Q": bitboard.WHITE_QUEENSIDE, "k": bitboard.BLACK_KINGSIDE, "q": bitboard.BLACK_QUEENSIDE}
+
+class Undo(NamedTuple):
+    move: int
+    taken_piece: Piece | None
+    en_passant: int | None
+    castling: int
+    turn: int
+    halfmove_clock: int
+    hash: int
 
 class Board:
+    debug_hash = False # verify the incremental zobrist key against a full recompute after every move
+    debug_evaluation = False # verify the running evaluation totals against a full recompute after every move
+
     def __init__(self):
-        self.squares: list[list[Square]] = list()
-        self.kings: list[Piece] = list()
-        self.pieces: dict[str, list[Piece]] = None
-        self.en_passant: tuple | None = None
-        self.castling_rights    = {util.PlayerColor.White: {util.CastlingRight.KingSide: True, util.CastlingRight.QueenSide: True},
-                                   util.PlayerColor.Black: {util.CastlingRight.KingSide: True, util.CastlingRight.QueenSide: True}
-                                   }
+        self.bitboards: list[int] = [0] * 12 # bitboard.piece_index(figure, color) -> squares of that piece
+        self.occupancy: list[int] = [0, 0] # White, Black
+        self.occupied: int = 0
+        self.mailbox: list[Piece | None] = [None] * 64
+        self.ep_square: int | None = None
+        self.castling: int = bitboard.ALL_CASTLING
         self.color_to_move = util.PlayerColor.White
-        self.turn = 0
+        self.turn = 0 # half moves played, the full move number is turn // 2 + 1
+        self.halfmove_clock = 0 # half moves since the last capture or pawn move, for the fifty-move rule
+        self.hash: int = zobrist.CASTLING[self.castling] # zobrist key of the position
+        self.pawn_hash: int = 0 # zobrist key of the pawns only
+        self.midgame: int = 0 # material and piece-square totals for White (see positionEvaluator.pieceSquareTables)
+        self.endgame: int = 0
+        self.phase: int = 0
         
     def end_turn(self) -> None:
         self.color_to_move = util.PlayerColor.opponent(self.color_to_move)
+        self.hash ^= zobrist.BLACK_TO_MOVE
     
     def get_copy(self) -> "Board":
         return deepcopy(self)
-        
+
+    @classmethod
+    def from_fen(cls, fen: str) -> "Board":
+        """Builds the position described by a FEN string, e.g. 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'"""
+        fields = fen.split()
+        if len(fields) < 4:
+            raise Exception(f"FEN needs at least 4 fields: {fen}")
+        placement, color, castling, en_passant = fields[:4]
+        rows = placement.split("/")
+        if len(rows) != DIMENSION or color not in ("w", "b"):
+            raise Exception(f"Invalid FEN: {fen}")
+        board = cls()
+        for row, line in enumerate(rows):
+            x = 0
+            for char in line:
+                if char.isdigit():
+                    x += int(char)
+                elif char in _FEN_PIECES:
+                    if x >= DIMENSION:
+                        raise Exception(f"Invalid FEN, rank {DIMENSION - row} too long: {fen}")
+                    board._put_piece(Piece(*_FEN_PIECES[char]), (7 - row) * DIMENSION + x)
+                    x += 1
+                else:
+                    raise Exception(f"Invalid FEN, unknown piece {char}: {fen}")
+            if x != DIMENSION:
+                raise Exception(f"Invalid FEN, rank {DIMENSION - row} has {x} squares: {fen}")
+        if bitboard.popcount(board.bitboards[bitboard.KING]) != 1 or bitboard.popcount(board.bitboards[6 + bitboard.KING]) != 1:
+            raise Exception(f"Invalid FEN, each side needs one king: {fen}")
+        if color == "b":
+            board.end_turn()
+        castling_mask = 0
+        if castling != "-":
+            for char in castling:
+                if char not in _FEN_CASTLING:
+                    raise Exception(f"Invalid FEN, unknown castling right {char}: {fen}")
+                castling_mask |= _FEN_CASTLING[char]
+        board.hash ^= zobrist.CASTLING[board.castling] ^ zobrist.CASTLING[castling_mask]
+        board.castling = castling_mask
+        if en_passant != "-":
+            board.ep_square = bitboard.to_index(en_passant)
+            board.hash ^= zobrist.EN_PASSANT_FILE[board.ep_square & 7]
+        board.halfmove_clock = int(fields[4]) if len(fields) > 4 else 0
+        full_moves = int(fields[5]) if len(fields) > 5 else 1
+        board.turn = (full_moves - 1) * 2 + (color == "b")
+        return board
+
+    def pack(self) -> tuple[int, ...]:
+        """The position as a flat tuple of ints (12 bitboards, side to move, castling, en passant square or -1, turn, halfmove clock).
+        Much cheaper to pickle than the board with its Piece objects"""
+        return (*self.bitboards, bitboard.COLOR_INDEX[self.color_to_move], self.castling,
+                -1 if self.ep_square is None else self.ep_square, self.turn, self.halfmove_clock)
+
+    @classmethod
+    def from_packed(cls, packed: tuple[int, ...]) -> "Board":
+        board = cls()
+        for index in range(12):
+            color = bitboard.COLORS[index // 6]
+            figure = bitboard.FIGURES[index % 6]
+            for square in bitboard.iter_bits(packed[index]):
+                board._put_piece(Piece(figure, color), square)
+        color, board.castling, en_passant, board.turn, board.halfmove_clock = packed[12:]
+        board.color_to_move = bitboard.COLORS[color]
+        board.ep_square = None if en_passant < 0 else en_passant
+        board.hash = zobrist.compute(board)
+        return board
+
     def as_fen(self) -> str:
-        pass # TODO return board in FEN format: "rnbqkbnr/pppppppp/8/8/8/8/pppppppp/rnbqkbnr"
+        """The position in Forsyth-Edwards Notation, e.g. 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'"""
+        rows = list()
+        mailbox = self.mailbox
+        for y in reversed(range(DIMENSION)):
+            row = ""
+            empty = 0
+            for piece in mailbox[y * DIMENSION: y * DIMENSION + DIMENSION]:
+                if piece is None:
+                    empty += 1
+                    continue
+                if empty:
+                    row += str(empty)
+                    empty = 0
+                row += str(piece)
+            rows.append(row + str(empty) if empty else row)
+        castling = "".join(char for char, bit in _FEN_CASTLING.items() if self.castling & bit) or "-"
+        en_passant = "-" if self.ep_square is None else util.to_chess_notation(bitboard.square_pos(self.ep_square)).lower()
+        return f"{'/'.join(rows)} {self.color_to_move} {castling} {en_passant} {self.halfmove_clock} {self.turn // 2 + 1}"
     
     def setup_board(self) -> None:
-        self._create_board()
         self._create_pieces()
-        self._place_pieces()
         print()
         
     def cls(self) -> None:
@@ -42,16 +146,17 @@ class Board:
         print("\n")
         if highlight_square_name:
             highlight_square = util.to_python_indecies(highlight_square_name)
-        for y, y_line in enumerate(reversed(self.squares)):
-            y = len(self.squares) - y
-            print_line = f"{y} {y-1}    "
-            for x, square in enumerate(y_line):
-                if highlights and (x,y-1) in highlights:
-                    print_line += self.color_line(square.content, "[31m") #red
-                elif highlight_square_name and highlight_square == (x,y-1):
-                    print_line += self.color_line(square.content,  "[32m") # green 
+        for y in reversed(range(DIMENSION)):
+            print_line = f"{y+1} {y}    "
+            for x in range(DIMENSION):
+                piece = self.mailbox[y * DIMENSION + x]
+                content = str(piece) if piece else "."
+                if highlights and (x,y) in highlights:
+                    print_line += self.color_line(content, "[31m") #red
+                elif highlight_square_name and highlight_square == (x,y):
+                    print_line += self.color_line(content,  "[32m") # green 
                 else:
-                    print_line += f" {square.content} "
+                    print_line += f" {content} "
             print(print_line)
         print("\n        0  1  2  3  4  5  6  7",end="")
         print("\n        A  B  C  D  E  F  G  H\n")
@@ -62,118 +167,146 @@ class Board:
         
         return f" {prefix}{color}{line}{suffix} "
 
-    def move_to(self, start_square: Square, target_square: Square) -> None:
-        piece = start_square.remove_piece()
-        taken_piece = target_square.place_piece(piece)
+    @property
+    def en_passant(self) -> tuple | None:
+        return None if self.ep_square is None else bitboard.square_pos(self.ep_square)
+
+    @property
+    def castling_rights(self) -> dict[str, dict[util.CastlingRight, bool]]:
+        """Read only view of the castling mask"""
+        return {color: {side: bool(self.castling & bitboard.CASTLING_BIT[(color, side)]) for side in util.CastlingRight}
+                for color in bitboard.COLORS}
+
+    @property
+    def kings(self) -> list[Piece]:
+        return [self.mailbox[bitboard.lsb(self.bitboards[bitboard.KING])], self.mailbox[bitboard.lsb(self.bitboards[6 + bitboard.KING])]]
+
+    def handle_move(self, start_square_pos: str | tuple, target_square_pos: str | tuple, promotion: str | None = None) -> None | Piece:
+        """Plays a move without passing the turn. Returns the taken piece if there is one"""
+        taken_piece = self._play(bitboard.to_index(start_square_pos), bitboard.to_index(target_square_pos), promotion)
+        if self.debug_hash:
+            self.verify_hash()
+        if self.debug_evaluation:
+            self.verify_evaluation()
+        return taken_piece
+
+    def make_move(self, move: int) -> Undo:
+        """Plays an encoded move (see chess.move) and passes the turn. Returns the record unmake_move needs to take it back"""
+        undo = Undo(move, None, self.ep_square, self.castling, self.turn, self.halfmove_clock, self.hash)
+        taken_piece = self._play(move & 63, move >> 6 & 63, bitboard.FIGURES[move >> 12] if move >> 12 else None)
+        self.end_turn()
+        if self.debug_hash:
+            self.verify_hash()
+        if self.debug_evaluation:
+            self.verify_evaluation()
         if taken_piece:
-            self.pieces[taken_piece.color].remove(taken_piece)
-        self.turn += 1
+            return undo._replace(taken_piece=taken_piece)
+        return undo
 
-    def handle_move(self, start_square_pos: str | tuple, target_square_pos: str | tuple, check_en_passant: bool = True) -> None | Piece:
-        self.handle_move_type(start_square_pos, target_square_pos)
-        
-    def handle_move_type(self, start_square_pos: str | tuple, target_square_pos: str | tuple):
-        start_square = self._get_square(start_square_pos)
-        target_square = self._get_square(target_square_pos)
-        piece = start_square.content
-        done = False
-        if piece.name == Piece.Figure.Pawn:
-            self.handle_promotion(piece)
-            done = self.handle_en_passant(piece, start_square, target_square)
-        elif piece.name == Piece.Figure.King:
-            if self.is_castling(piece, target_square):
-                self.handle_castling(piece, target_square)
-                done = True
+    def unmake_move(self, undo: Undo) -> None:
+        """Restores the position exactly as it was before make_move returned undo"""
+        move = undo.move
+        start = move & 63
+        target = move >> 6 & 63
+        self.end_turn()
+        piece = self._remove_piece(target)
+        if move >> 12:
+            piece.promote_to(Piece.Figure.Pawn)
+        self._put_piece(piece, start)
+        if piece.name == Piece.Figure.King and abs(target - start) == 2:
+            side = util.get_castling_side(bitboard.square_pos(target))
+            rook_row = util.color_home_rank[piece.color] * DIMENSION
+            self._move_piece(rook_row + util.rook_castling_end_position[side], rook_row + util.rook_castling_start_position[side])
+        taken_piece = undo.taken_piece
+        if taken_piece:
+            if target == undo.en_passant and piece.name == Piece.Figure.Pawn:
+                target = target - 8 if piece.color == Piece.Color.White else target + 8
+            self._put_piece(taken_piece, target)
+        self.ep_square = undo.en_passant
+        self.castling = undo.castling
+        self.turn = undo.turn
+        self.halfmove_clock = undo.halfmove_clock
+        self.hash = undo.hash
+        if self.debug_hash:
+            self.verify_hash()
+        if self.debug_evaluation:
+            self.verify_evaluation()
+
+    def verify_hash(self) -> None:
+        if self.hash != zobrist.compute(self):
+            raise Exception(f"Zobrist key out of sync: incremental {self.hash:016x}, recomputed {zobrist.compute(self):016x}")
+        if self.pawn_hash != zobrist.compute_pawns(self):
+            raise Exception(f"Pawn key out of sync: incremental {self.pawn_hash:016x}, recomputed {zobrist.compute_pawns(self):016x}")
+
+    def verify_evaluation(self) -> None:
+        pieces = ((bitboard.piece_index(piece.name, piece.color), square) for square, piece in enumerate(self.mailbox) if piece)
+        totals = pst.compute(pieces)
+        if totals != (self.midgame, self.endgame, self.phase):
+            raise Exception(f"Evaluation totals out of sync: incremental {(self.midgame, self.endgame, self.phase)}, recomputed {totals}")
+
+    def _play(self, start: int, target: int, promotion: str | None) -> None | Piece:
+        piece = self.mailbox[start]
+        en_passant = self.ep_square
+        if en_passant is not None:
+            self.hash ^= zobrist.EN_PASSANT_FILE[en_passant & 7]
+            self.ep_square = None
+        taken_piece = None
+        pawn_move = piece.name == Piece.Figure.Pawn # before a promotion renames the piece
+        if pawn_move:
+            if target == en_passant:
+                taken_piece = self.handle_en_passant(start, target)
             else:
-                self.castling_rights[piece.color][util.CastlingRight.KingSide]  = False
-                self.castling_rights[piece.color][util.CastlingRight.QueenSide] = False
-            
-        elif piece.name == Piece.Figure.Rook:
-            if util.rook_castling_start_position[util.CastlingRight.KingSide] == piece.pos[0]:
-                self.castling_rights[piece.color][util.CastlingRight.KingSide] = False
-            elif util.rook_castling_start_position[util.CastlingRight.QueenSide] == piece.pos[0]:
-                self.castling_rights[piece.color][util.CastlingRight.QueenSide] = False
-
-        if done:
-            return
-            
-        self.move_to(start_square, target_square)
+                if abs(target - start) == 16:
+                    self.ep_square = (start + target) // 2
+                    self.hash ^= zobrist.EN_PASSANT_FILE[start & 7]
+                taken_piece = self._move_piece(start, target)
+                if promotion:
+                    self.handle_promotion(piece, promotion)
+        elif piece.name == Piece.Figure.King and abs(target - start) == 2:
+            self.handle_castling(piece, target)
+        else:
+            taken_piece = self._move_piece(start, target)
+        castling = self.castling & bitboard.CASTLING_KEEP[start] & bitboard.CASTLING_KEEP[target]
+        if castling != self.castling:
+            self.hash ^= zobrist.CASTLING[self.castling] ^ zobrist.CASTLING[castling]
+            self.castling = castling
+        self.turn += 1
+        self.halfmove_clock = 0 if taken_piece or pawn_move else self.halfmove_clock + 1
+        return taken_piece
     
-    def handle_promotion(self, pawn: Piece) -> None:
+    def handle_promotion(self, pawn: Piece, figure: str) -> None:
         if self.can_pawn_promote(pawn):
-            pawn.promote_to(self.input_promotion(pawn))
-    
-    def is_castling(self, piece: Piece, target_square: Square) -> bool:
-        color = piece.color
-        if not self.castling_rights[color][util.CastlingRight.KingSide] and self.castling_rights[color][util.CastlingRight.QueenSide]:
-            return False
-           
-        side = util.get_castling_side(target_square.pos())
-        if side is None:
-            return False
-        
-        return self.castling_rights[piece.color][side]
+            square = bitboard.square_index(pawn.pos)
+            self._remove_piece(square)
+            pawn.promote_to(figure)
+            self._put_piece(pawn, square)
     
-    def handle_castling(self, king: Piece, king_target_square: Square):
-        side = util.get_castling_side(king_target_square.pos())
-        rook_target_column  = util.rook_castling_end_position[side]
-        rook_start_column   = util.rook_castling_start_position[side]
-        rook_row            = util.color_home_rank[king.color]
+    def handle_castling(self, king: Piece, king_target: int) -> None:
+        side = util.get_castling_side(bitboard.square_pos(king_target))
+        rook_row = util.color_home_rank[king.color] * DIMENSION
+        self._move_piece(rook_row + util.rook_castling_start_position[side], rook_row + util.rook_castling_end_position[side])
+        self._move_piece(bitboard.square_index(king.pos), king_target)
         
-        rook_origin_square = self._get_square((rook_start_column, rook_row))
-        rook_target_square = self._get_square((rook_target_column, rook_row))
-        king_origin_square = self._get_square(king.pos)
-        
-        rook    = rook_origin_square.remove_piece()
-        _       = king_origin_square.remove_piece()
-        rook_target_square.place_piece(rook)
-        king_target_square.place_piece(king)
-        
-        self.castling_rights[king.color][util.CastlingRight.KingSide] = False
-        self.castling_rights[king.color][util.CastlingRight.QueenSide] = False
-        
-    def handle_en_passant(self, piece: Piece, start_square: Square, target_square: Square) -> None:
-        # move_to always calls this function currently, also when checking for check multiple times.
-        # TODO: fix this
-        WHITE_PAWN = 3
-        COLUMN = 0
-        ROW = 1
-        FORWARD_BLACK = -1
-        FORWARD_WHITE = 1
-        start_pos = start_square.pos()
-        target_pos = target_square.pos()
-        if target_pos == self.en_passant:
-            self.move_to(start_square, target_square)
-            target_pos = (target_pos[COLUMN],target_pos[ROW]+FORWARD_WHITE) if target_pos[ROW] == WHITE_PAWN else (target_pos[COLUMN], target_pos[ROW]+FORWARD_BLACK)
-            self.remove_piece_from_game(self.get_piece(target_pos))
-            
-            self.en_passant = None  
-            return True    
-        elif abs(start_pos[ROW] - target_pos[ROW]) > 1:
-            self.en_passant = (piece.pos[COLUMN], piece.pos[ROW]+FORWARD_WHITE) if piece.color == Piece.Color.White else (piece.pos[COLUMN], piece.pos[ROW]+FORWARD_BLACK)
-            return False
-        else:
-            self.en_passant = None
-            return False
+    def handle_en_passant(self, start: int, target: int) -> Piece:
+        taken_square = target - 8 if self.mailbox[start].color == Piece.Color.White else target + 8
+        taken_piece = self._remove_piece(taken_square)
+        self._move_piece(start, target)
+        return taken_piece
     
     def remove_piece_from_game(self, piece: Piece) -> None:
-        self.pieces[piece.color].remove(piece)
-        self._get_square(piece.pos).remove_piece()
+        self._remove_piece(bitboard.square_index(piece.pos))
     
     def get_pieces(self, color: util.PlayerColor | None = None) -> list[Piece]:
         if color is None:
             color = self.color_to_move
-        return self.pieces[color]
+        mailbox = self.mailbox
+        return [mailbox[square] for square in bitboard.iter_bits(self.occupancy[bitboard.COLOR_INDEX[color]])]
     
     def get_piece(self, square: str | tuple) -> Piece:
-        if isinstance(square, str):
-            x, y = util.to_python_indecies(square)
-        else:
-            x,y = square
-        if self.has_piece((x,y)):
-            return self.squares[y][x].content
-        else:
+        piece = self.mailbox[bitboard.to_index(square)]
+        if piece is None:
             raise Exception(f"No piece on square {square}")
+        return piece
         
     def can_pawn_promote(self, piece: Piece) -> bool:
         return piece.color == Piece.Color.White and piece.pos[1] == 7 or piece.color == Piece.Color.Black and piece.pos[1] == 0
@@ -182,60 +315,60 @@ class Board:
         return abs(pos_k1[0]-pos_k2[0]) < 2 and abs(pos_k1[1]-pos_k2[1]) < 2
         
     def get_enemys_king_position(self, own_color: str) -> tuple:
-        return self.kings[1].pos if own_color == util.PlayerColor.White else self.kings[0].pos
+        return self.get_king_from_color(util.PlayerColor.opponent(own_color)).pos
     
     def get_king_from_color(self, color: str) -> Piece:
-        return self.kings[0] if color == util.PlayerColor.White else self.kings[1] 
-    
-    def _get_square(self, square: str | tuple) -> Square:
-        if isinstance(square, str):
-            x, y = util.to_python_indecies(square)
-        elif isinstance(square, tuple):
-            x, y = square
-        return self.squares[y][x]
+        return self.mailbox[bitboard.lsb(self.bitboards[bitboard.COLOR_INDEX[color] * 6 + bitboard.KING])]
 
     def has_piece(self, square: str | tuple[int, int]) -> bool:
-        if isinstance(square, str):
-            x, y = util.to_python_indecies(square)
-        elif isinstance(square, tuple):
-            x, y = square
-        return isinstance(self.squares[y][x].content, Piece)
-
-    def _create_board(self) -> None:    
-        for y in range(DIMENSION):
-            self.squares.append(list())
-            for x in range(DIMENSION):
-                square = Square()
-                square.set_pos(x,y)
-                self.squares[y].append(square)        
+        return bool(self.occupied >> bitboard.to_index(square) & 1)
+
+    def _put_piece(self, piece: Piece, square: int) -> None:
+        mask = 1 << square
+        index = bitboard.piece_index(piece.name, piece.color)
+        self.bitboards[index] |= mask
+        self.hash ^= zobrist.PIECE_SQUARE[index][square]
+        if index == bitboard.WHITE * 6 + bitboard.PAWN or index == bitboard.BLACK * 6 + bitboard.PAWN:
+            self.pawn_hash ^= zobrist.PIECE_SQUARE[index][square]
+        self.midgame += pst.MIDGAME[index][square]
+        self.endgame += pst.ENDGAME[index][square]
+        self.phase += pst.PHASE[index]
+        self.occupancy[bitboard.COLOR_INDEX[piece.color]] |= mask
+        self.occupied |= mask
+        self.mailbox[square] = piece
+        piece.set_pos(bitboard.square_pos(square))
+
+    def _remove_piece(self, square: int) -> Piece | None:
+        piece = self.mailbox[square]
+        if piece is None:
+            return None
+        mask = ~(1 << square)
+        index = bitboard.piece_index(piece.name, piece.color)
+        self.bitboards[index] &= mask
+        self.hash ^= zobrist.PIECE_SQUARE[index][square]
+        if index == bitboard.WHITE * 6 + bitboard.PAWN or index == bitboard.BLACK * 6 + bitboard.PAWN:
+            self.pawn_hash ^= zobrist.PIECE_SQUARE[index][square]
+        self.midgame -= pst.MIDGAME[index][square]
+        self.endgame -= pst.ENDGAME[index][square]
+        self.phase -= pst.PHASE[index]
+        self.occupancy[bitboard.COLOR_INDEX[piece.color]] &= mask
+        self.occupied &= mask
+        self.mailbox[square] = None
+        return piece
+
+    def _move_piece(self, start: int, target: int) -> Piece | None:
+        """Moves the piece on start to target and returns the piece taken on target"""
+        taken_piece = self._remove_piece(target)
+        self._put_piece(self._remove_piece(start), target)
+        return taken_piece
                 
-    def _create_pieces(self) -> list:
-        self.pieces = dict()
+    def _create_pieces(self) -> None:
+        back_rank = [Piece.Figure.Rook, Piece.Figure.Knight, Piece.Figure.Bishop, Piece.Figure.Queen,
+                     Piece.Figure.King, Piece.Figure.Bishop, Piece.Figure.Knight, Piece.Figure.Rook]
         for color in [Piece.Color.White, Piece.Color.Black]:
-            pieces_list = list()
-            self.pieces.setdefault(color, pieces_list)
-            pieces_list.append(Piece(Piece.Figure.Rook, color))
-            pieces_list.append(Piece(Piece.Figure.Knight, color))
-            pieces_list.append(Piece(Piece.Figure.Bishop, color))
-            pieces_list.append(Piece(Piece.Figure.Queen, color))
-            pieces_list.append(Piece(Piece.Figure.King, color))
-            self.kings.append(pieces_list[-1])
-            pieces_list.append(Piece(Piece.Figure.Bishop, color))
-            pieces_list.append(Piece(Piece.Figure.Knight, color))
-            pieces_list.append(Piece(Piece.Figure.Rook, color))
-            for _ in range(8):
-                pieces_list.append(Piece(Piece.Figure.Pawn, color))
-                
-    def _place_pieces(self) -> None:        
-        for x, piece in enumerate(self.pieces[util.PlayerColor.White][0:8]):
-            self.squares[0][x].place_piece(piece)
-            piece.set_pos((x, 0))
-        for x, white_pawn in enumerate(self.pieces[util.PlayerColor.White][8:16]):
-            self.squares[1][x].place_piece(white_pawn)
-            white_pawn.set_pos((x, 1))
-        for x, piece in enumerate(self.pieces[util.PlayerColor.Black][0:8]):
-            self.squares[7][x].place_piece(piece)
-            piece.set_pos((x, 7))
-        for x, black_pawn in enumerate(self.pieces[util.PlayerColor.Black][8:16]):
-            self.squares[6][x].place_piece(black_pawn)
-            black_pawn.set_pos((x, 6))
+            home_rank = util.color_home_rank[color]
+            pawn_rank = home_rank + 1 if color == Piece.Color.White else home_rank - 1
+            for x, figure in enumerate(back_rank):
+                self._put_piece(Piece(figure, color), home_rank * DIMENSION + x)
+            for x in range(DIMENSION):
+                self._put_piece(Piece(Piece.Figure.Pawn, color), pawn_rank * DIMENSION + x)
@@ -0,0 +1,47 @@
+import struct
+
+from . import bitboard
+from . import util
+from .board import Board
+
+# A position in 32 bytes, little endian:
+#   occupancy   8 bytes  occupied squares
+#   pieces     16 bytes  Board.bitboards index of every occupied square from A1 up, one nibble each, low nibble first
+#   flags       1 byte   bit 0: Black to move, bits 1-4: castling mask
+#   en passant  1 byte   square, NO_EN_PASSANT if none
+#   halfmove    1 byte   halfmove clock, capped at 255
+#   reserved    1 byte   0
+#   full move   2 bytes  full move number, capped at 65535
+#   label       2 bytes  signed, free for whoever stores the position (a score, a game result)
+RECORD = struct.Struct("<Q16sBBBBHh")
+RECORD_BYTES = RECORD.size
+NO_EN_PASSANT = 0xFF
+MAX_PIECES = 32
+
+
+def encode(board: Board, label: int = 0) -> bytes:
+    occupied = board.occupied
+    if bitboard.popcount(occupied) > MAX_PIECES:
+        raise Exception(f"More than {MAX_PIECES} pieces can't be encoded")
+    pieces = bytearray(16)
+    mailbox = board.mailbox
+    for number, square in enumerate(bitboard.iter_bits(occupied)):
+        piece = mailbox[square]
+        pieces[number >> 1] |= bitboard.piece_index(piece.name, piece.color) << (number & 1) * 4
+    flags = (board.color_to_move == util.PlayerColor.Black) | board.castling << 1
+    en_passant = NO_EN_PASSANT if board.ep_square is None else board.ep_square
+    return RECORD.pack(occupied, bytes(pieces), flags, en_passant, min(board.halfmove_clock, 255), 0,
+                       min(board.turn // 2 + 1, 0xFFFF), label)
+
+def decode(record: bytes) -> Board:
+    """The Board of an encoded position. The label is read with decode_label"""
+    occupied, pieces, flags, en_passant, halfmove_clock, _, full_moves, _ = RECORD.unpack(record)
+    bitboards = [0] * 12
+    for number, square in enumerate(bitboard.iter_bits(occupied)):
+        bitboards[pieces[number >> 1] >> (number & 1) * 4 & 15] |= 1 << square
+    black_to_move = flags & 1
+    return Board.from_packed((*bitboards, black_to_move, flags >> 1 & 15, -1 if en_passant == NO_EN_PASSANT else en_passant,
+                              (full_moves - 1) * 2 + black_to_move, halfmove_clock))
+
+def decode_label(record: bytes) -> int:
+    return RECORD.unpack(record)[-1]
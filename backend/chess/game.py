@@ -6,28 +6,51 @@ from . import Board
 from . import Piece
 from . import util
 from . import BoardHistory
+from . import move
 from ..moveCalculation.moveCalculator import MoveCalculator
-from ..ai.bruteForce.bruteForce import BruteForce
+from .. import san
+from ..ai.alphaBeta.alphaBeta import AlphaBeta
+from ..ai.parallelAlphaBeta.parallelAlphaBeta import ParallelAlphaBeta
+from ..ai.ai import SearchLimits
+from ..ai.ai import SearchResult
+from ..ai.searchHandle import SearchHandle
+from ..ai.openingBook.openingBook import OpeningBook
+from ..bitbases.bitbases import Bitbases
 
 PVP = True
+AI_TIME_LIMIT = 3.0 # seconds per AI move
+AI_WORKERS = 1 # processes the AI searches with, more than 1 splits the root moves across a process pool
+AI_PONDER = True # let the AI think about the expected reply while the player is thinking
+AI_BOOK_PATH: str | None = None # opening book file (see ai.openingBook), None plays without book
+AI_BITBASE_DIRECTORY: str | None = None # endgame bitbase files (see bitbases), None: the default directory if they were generated
 
 class Game:
-    def __init__(self) -> None:
+    def __init__(self, fen: str | None = None) -> None:
+        """A game from the start position, or from the position fen describes"""
         self.setup_pgn_info()
-        self.moves: list[str]   = list()
-        self.board: Board       = Board()
-        self.board.setup_board()
+        self.moves: list[str]   = list() # SAN of every half move
+        self.start_fen          = fen
+        if fen is None:
+            self.board: Board   = Board()
+            self.board.setup_board()
+        else:
+            self.board          = Board.from_fen(fen)
+            self.turn           = self.board.turn // 2 + 1
         self.move_calculator    = MoveCalculator()
-        self.ai                 = BruteForce(self.board)
+        self.ai                 = ParallelAlphaBeta(self.board, workers=AI_WORKERS) if AI_WORKERS > 1 else AlphaBeta(self.board)
         self.checkmate          = False
+        self.stalemate          = False
         self.board_history      = BoardHistory(self.board)
+        self.ponder_search: SearchHandle | None = None
+        if AI_BOOK_PATH:
+            self.ai.opening_book = OpeningBook(AI_BOOK_PATH)
+        bitbases = Bitbases(AI_BITBASE_DIRECTORY) if AI_BITBASE_DIRECTORY else Bitbases()
+        if bitbases:
+            self.ai.evaluator.bitbases = bitbases
         
     def setup_pgn_info(self) -> None:
-        self.en_passant = "-"
-        self.half_turns_since_event = 0 # pawn moved or piece taken
         self.turn = 1
-        self.castings_still_possible = "KQkq"
-        self.date = datetime.now().isoformat()
+        self.date = datetime.now().strftime("%Y.%m.%d")
         self.tournament = "None"
         self.site = "Germany"
         self.round = 1
@@ -36,11 +59,33 @@ class Game:
         self.result = "*" # 1-0 = white won, 0-1 = black won, 1/2-1/2 = remis, * inclomplete
     
     def ai_turn(self) -> None:
-        move = self.ai.get_move()
-        self.board.handle_move(move[0], move[1])
-        self.board.end_turn()
+        if self.lost_game():
+            return False
+        result = self.ai_search()
+        if result.move is None: # no legal move to play, lost_game should have seen it already
+            self.stalemate = not self.is_check()
+            self.checkmate = not self.stalemate
+            return False
+        self.play_move(result.move)
+        self.start_pondering(result)
         return self.end_turn()
 
+    def ai_search(self) -> SearchResult:
+        """Uses the ponder search if the player made the expected move, else searches from scratch"""
+        ponder_search = self.ponder_search
+        self.ponder_search = None
+        if ponder_search is not None:
+            if ponder_search.board.hash == self.board.hash:
+                ponder_search.ponderhit(AI_TIME_LIMIT)
+                return ponder_search.result()
+            ponder_search.stop()
+            ponder_search.result()
+        return self.ai.start_search(self.board, SearchLimits(time_limit=AI_TIME_LIMIT)).result()
+
+    def start_pondering(self, result: SearchResult) -> None:
+        if AI_PONDER and len(result.pv) > 1:
+            self.ponder_search = self.ai.start_search(self.board, ponder_move=result.pv[1])
+
     def start(self) -> None:
         while True:
             if not PVP and self.ai.playing_as_color == self.board.color_to_move:
@@ -59,6 +104,8 @@ class Game:
     def debug_go_back(self, square_name: str) -> str:
         if square_name == "X":
             self.board = self.board_history.go_back()
+            if self.moves:
+                self.moves.pop()
             return True
         else:
             return False
@@ -69,8 +116,11 @@ class Game:
         self.board.show_board(valid_moves, square_name)
         return self.input_move(valid_moves)
 
-    def handle_moving_piece_to(self, square_name: str, target_square_name) -> tuple[Piece]:
-        taken_piece = self.board.handle_move(square_name, target_square_name)
+    def play_move(self, played_move: int) -> None:
+        """Plays an encoded move (see chess.move) and adds its SAN to moves.
+        The SAN is written from the legal moves lost_game generated at the start of the turn"""
+        self.moves.append(san.to_san(self.board, played_move, self.move_calculator.legal_moves, self.move_calculator))
+        self.board.make_move(played_move)
 
     def play_turn(self) -> bool:
         """Return 'False' to repeat turn. Return 'True' to end turn"""
@@ -82,29 +132,28 @@ class Game:
         target_square_name = self.get_where_to_move_piece(origin_square_name)
         if target_square_name is None:
             return False
-        self.handle_moving_piece_to(origin_square_name, target_square_name)
-        self.en_passant = self.board.en_passant if self.board.en_passant else "-"
-        piece = self.board.get_piece(target_square_name)
-        if piece.name == Piece.Figure.Pawn:
-            self.handle_promotion(piece)
-        self.board.end_turn()
+        piece = self.board.get_piece(origin_square_name)
+        promotion = None
+        if piece.name == Piece.Figure.Pawn and util.to_python_indecies(target_square_name)[1] in (0, 7):
+            promotion = self.input_promotion(piece)
+        self.play_move(move.from_positions(origin_square_name, target_square_name, promotion))
         return True
     
-    def handle_promotion(self, pawn: Piece) -> None:
-        if self.board.can_pawn_promote(pawn):
-            pawn.promote_to(self.input_promotion(pawn))
-    
     def is_check(self) -> bool:
         king = self.board.get_king_from_color(self.board.color_to_move)
         return self.move_calculator.king_under_attack(king)
             
     def end_game(self) -> None:
         self.board.show_board()
-        self.result = util.PGN_win[self.board.color_to_move]
+        if self.stalemate:
+            self.result = util.PGN_win[None]
+            print(f"Stalemate - {util.full_color(self.board.color_to_move)} can't move, the game is drawn!")
+            return
+        self.result = util.PGN_win[util.PlayerColor.opponent(self.board.color_to_move)]
         print(f"Checkmate - {util.full_color(self.board.color_to_move)} lost!")
     
     def end_turn(self) -> None:
-        if self.checkmate:
+        if self.checkmate or self.stalemate:
             return False
         
         # self.board.handle_promotion()
@@ -125,7 +174,7 @@ class Game:
     def display_promotion_message(self, piece: Piece) -> None:
         os.system("cls")
         self.board.show_board()
-        print(f"-- Pawn reached backrank at {util.to_chess_notation(piece.pos)} --\n")
+        print(f"-- Pawn on {util.to_chess_notation(piece.pos)} reaches the back rank --\n")
     
     def promote_to_queen(self) -> Piece.Figure | None:
         while True:
@@ -148,10 +197,15 @@ class Game:
                 print(f"Error! Your input {answer} is not valid.\n")
 
     def lost_game(self) -> bool:
+        """True if the side to move has no legal move: checkmate if it is in check, else stalemate"""
         can_move = self.move_calculator.calc_all_valid_moves(self.board)
-        if not can_move and self.is_check():
+        if can_move:
+            return False
+        if self.is_check():
             self.checkmate = True
-            return True
+        else:
+            self.stalemate = True
+        return True
     
     def input_move(self, valid_moves: list[tuple]) -> str | None:
         """Return selected square to move to or 'x' : abort"""
@@ -211,7 +265,7 @@ class Game:
         return color[self.board.color_to_move]
     
     def as_fen(self) -> str: # Forsyth-Edwards Notation
-        return f"{self.board.as_fen()} {self.board.color_to_move} {self.castings_still_possible} {self.en_passant} {self.half_turns_since_event} {self.turn}"
+        return self.board.as_fen()
 
     def as_pgn(self) -> dict: # Portable Game Notation
         return {"Event" : self.tournament,
@@ -221,4 +275,5 @@ class Game:
                 "White" : self.white_playername,
                 "Black" : self.black_playername,
                 "Result": self.result,
+                **({"SetUp": "1", "FEN": self.start_fen} if self.start_fen else {}),
                 "Moves" : self.moves}
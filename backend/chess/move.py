@@ -0,0 +1,38 @@
+from . import bitboard
+from . import util
+
+# A move is a plain int: start square | target square << 6 | promotion figure << 12
+# Squares are bitboard indices, promotion is a bitboard figure index (0 = no promotion)
+
+PROMOTION_FIGURES = [bitboard.QUEEN, bitboard.ROOK, bitboard.BISHOP, bitboard.KNIGHT]
+
+
+def encode(start: int, target: int, promotion: int = 0) -> int:
+    return start | target << 6 | promotion << 12
+
+def start(move: int) -> int:
+    return move & 63
+
+def target(move: int) -> int:
+    return move >> 6 & 63
+
+def promotion(move: int) -> int:
+    return move >> 12
+
+def promotion_figure(move: int) -> str | None:
+    """Promotion as Piece.Figure name or None"""
+    figure = move >> 12
+    return bitboard.FIGURES[figure] if figure else None
+
+def from_positions(start_pos: str | tuple, target_pos: str | tuple, promotion_name: str | None = None) -> int:
+    promotion = bitboard.FIGURE_INDEX[promotion_name] if promotion_name else 0
+    return encode(bitboard.to_index(start_pos), bitboard.to_index(target_pos), promotion)
+
+def to_positions(move: int) -> tuple[tuple[int, int], tuple[int, int]]:
+    return bitboard.square_pos(move & 63), bitboard.square_pos(move >> 6 & 63)
+
+def to_uci(move: int) -> str:
+    """Long algebraic notation as used by UCI, e.g. 'e2e4' or 'e7e8q'"""
+    start_pos, target_pos = to_positions(move)
+    promotion = promotion_figure(move) or ""
+    return (util.to_chess_notation(start_pos) + util.to_chess_notation(target_pos)).lower() + promotion
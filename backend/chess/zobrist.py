@@ -0,0 +1,44 @@
+import random
+
+from . import bitboard
+from . import util
+
+# Fixed seed: keys have to be identical between runs, hashes are stored in files (opening book, tables)
+_random = random.Random(0x43484553)
+
+def _key() -> int:
+    return _random.getrandbits(64)
+
+PIECE_SQUARE: list[list[int]] = [[_key() for _ in range(64)] for _ in range(12)]
+BLACK_TO_MOVE: int = _key()
+_CASTLING_BITS = [_key() for _ in range(4)]
+CASTLING: list[int] = [0] * 16 # indexed by the full castling mask
+for mask in range(16):
+    for bit, key in enumerate(_CASTLING_BITS):
+        if mask >> bit & 1:
+            CASTLING[mask] ^= key
+EN_PASSANT_FILE: list[int] = [_key() for _ in range(8)]
+
+
+def compute(board) -> int:
+    """Full recompute of the key of board. Board keeps its key up to date incrementally, this is the reference"""
+    key = 0
+    for index, pieces in enumerate(board.bitboards):
+        keys = PIECE_SQUARE[index]
+        for square in bitboard.iter_bits(pieces):
+            key ^= keys[square]
+    if board.color_to_move == util.PlayerColor.Black:
+        key ^= BLACK_TO_MOVE
+    key ^= CASTLING[board.castling]
+    if board.ep_square is not None:
+        key ^= EN_PASSANT_FILE[board.ep_square & 7]
+    return key
+
+def compute_pawns(board) -> int:
+    """Full recompute of the pawn key: the part of the key that comes from pawns, so it only changes on pawn moves and captures"""
+    key = 0
+    for index in (bitboard.WHITE * 6 + bitboard.PAWN, bitboard.BLACK * 6 + bitboard.PAWN):
+        keys = PIECE_SQUARE[index]
+        for square in bitboard.iter_bits(board.bitboards[index]):
+            key ^= keys[square]
+    return key
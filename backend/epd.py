@@ -0,0 +1,206 @@
+"""EPD test suites: positions with the best move (bm) or moves to avoid (am), searched by the AI on a process pool.
+
+python run_epd.py suite.epd --time 5
+python run_epd.py suite.epd --depth 6 --workers 8 --csv results.csv --json results.json
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import NamedTuple
+
+from .chess import Board
+from .ai.alphaBeta.alphaBeta import AlphaBeta, MAX_DEPTH
+from .bitbases.bitbases import Bitbases
+from .moveCalculation.moveCalculator import MoveCalculator
+from . import san
+
+_OPERATION = re.compile(r'\s*([A-Za-z]\w*)((?:\s*(?:"[^"]*"|[^\s;"]+))*)\s*;')
+_OPERAND = re.compile(r'"([^"]*)"|([^\s"]+)')
+_VERDICTS = {True: "solved", False: "failed", None: "unscored"}
+CSV_FIELDS = ["id", "fen", "best_moves", "avoid_moves", "move", "solved", "score", "depth", "nodes", "seconds", "nps"]
+
+
+class EpdPosition(NamedTuple):
+    fen: str
+    operations: dict[str, list[str]] # opcode -> operands, quotes removed
+
+    @property
+    def id(self) -> str:
+        return " ".join(self.operations.get("id", []))
+
+    @property
+    def best_moves(self) -> list[str]:
+        return self.operations.get("bm", [])
+
+    @property
+    def avoid_moves(self) -> list[str]:
+        return self.operations.get("am", [])
+
+class EpdResult(NamedTuple):
+    id: str
+    fen: str
+    best_moves: list[str]
+    avoid_moves: list[str]
+    move: str # SAN of the move the AI chose, "" without legal moves
+    solved: bool | None # None if the position has neither best moves nor moves to avoid
+    score: int
+    depth: int
+    nodes: int
+    seconds: float
+
+    @property
+    def nps(self) -> float:
+        return self.nodes / self.seconds if self.seconds > 0 else 0.0
+
+    def as_dict(self) -> dict:
+        return {**self._asdict(), "nps": self.nps}
+
+
+def parse_epd(line: str) -> EpdPosition:
+    """One EPD record: the four position fields of a FEN followed by operations like 'bm Nf3 Qd4; id "WAC.001";'.
+    The hmvc and fmvn operations become the move counters of the FEN"""
+    fields = line.split(None, 4)
+    if len(fields) < 4:
+        raise Exception(f"EPD needs at least 4 fields: {line}")
+    operations = dict()
+    rest = fields[4] if len(fields) > 4 else ""
+    for match in _OPERATION.finditer(rest):
+        operations[match.group(1)] = [quoted if quoted else plain for quoted, plain in _OPERAND.findall(match.group(2))]
+    halfmove_clock = operations.get("hmvc", ["0"])[0]
+    full_moves = operations.get("fmvn", ["1"])[0]
+    return EpdPosition(f"{' '.join(fields[:4])} {halfmove_clock} {full_moves}", operations)
+
+def read_epd(lines):
+    """Positions of an EPD file (or any iterable of lines). Empty lines and lines starting with # are skipped"""
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield parse_epd(line)
+
+
+_searcher: AlphaBeta | None = None # the AI of a pool process, created by _init_worker
+
+def _init_worker(hash_mb: float, bitbase_directory: str | None) -> None:
+    global _searcher
+    _searcher = AlphaBeta(Board(), hash_mb=hash_mb)
+    bitbases = Bitbases(bitbase_directory) if bitbase_directory else None
+    if bitbases:
+        _searcher.evaluator.bitbases = bitbases
+
+def _solve(position: EpdPosition, depth: int | None, time_limit: float | None, node_limit: int | None) -> EpdResult:
+    return solve(_searcher, position, depth, time_limit, node_limit)
+
+def solve(ai: AlphaBeta, position: EpdPosition, depth: int | None = None, time_limit: float | None = None, node_limit: int | None = None) -> EpdResult:
+    """Searches one position with empty tables and move ordering history, so the result doesn't depend on the positions searched before.
+    Solved means the chosen move is one of the best moves and none of the moves to avoid, positions with neither are unscored"""
+    board = Board.from_fen(position.fen)
+    ai.transposition_table.clear()
+    ai.move_ordering.clear()
+    ai.evaluator.pawn_table.clear()
+    if depth is None and time_limit is None and node_limit is None:
+        depth = ai.current_depth
+    start = time.perf_counter()
+    result = ai.search(board, depth or MAX_DEPTH, time_limit, node_limit)
+    seconds = time.perf_counter() - start
+
+    move_calculator = MoveCalculator()
+    legal_moves = move_calculator.generate_moves(board)
+    solved = None
+    if position.best_moves or position.avoid_moves:
+        best = _parse_moves(board, position.best_moves, move_calculator, legal_moves)
+        avoid = _parse_moves(board, position.avoid_moves, move_calculator, legal_moves)
+        solved = result.move is not None
+        if position.best_moves:
+            solved = solved and result.move in best
+        if position.avoid_moves:
+            solved = solved and result.move not in avoid
+    move = san.to_san(board, result.move, legal_moves, move_calculator) if result.move is not None else ""
+    return EpdResult(position.id, position.fen, position.best_moves, position.avoid_moves, move, solved,
+                     result.score, result.depth, result.nodes, seconds)
+
+def _parse_moves(board: Board, sans: list[str], move_calculator: MoveCalculator, legal_moves: list[int]) -> set[int]:
+    moves = set()
+    for san_move in sans:
+        try:
+            moves.add(san.parse_san(board, san_move, move_calculator, legal_moves))
+        except Exception:
+            pass # an operand that is no legal move can't match the AI's move
+    return moves
+
+def run_suite(positions: list[EpdPosition], depth: int | None = None, time_limit: float | None = None, node_limit: int | None = None,
+              workers: int | None = None, hash_mb: float = 16, bitbase_directory: str | None = None, report=print) -> list[EpdResult]:
+    """Searches every position, workers at a time (default: one per core). Results come back in the order of positions,
+    report gets a line for each as it completes, numbered in the order of completion"""
+    workers = workers or os.cpu_count() or 1
+    def reported(number: int, result: EpdResult) -> EpdResult:
+        if report:
+            report(f"{number:>4}/{len(positions)}  {result.id or result.fen:<24} {_VERDICTS[result.solved]:<8}  {result.move:<8} "
+                   f"depth {result.depth:>2}  {result.nodes:>9} nodes  {result.seconds:6.2f}s  {result.nps:8.0f} nps")
+        return result
+    if workers == 1:
+        _init_worker(hash_mb, bitbase_directory)
+        return [reported(number, _solve(position, depth, time_limit, node_limit)) for number, position in enumerate(positions, start=1)]
+    results: list[EpdResult | None] = [None] * len(positions)
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(hash_mb, bitbase_directory)) as executor:
+        futures = {executor.submit(_solve, position, depth, time_limit, node_limit): index for index, position in enumerate(positions)}
+        for number, future in enumerate(as_completed(futures), start=1):
+            results[futures[future]] = reported(number, future.result())
+    return results
+
+def summary(results: list[EpdResult]) -> dict:
+    """Totals of a suite. Only scored positions count towards solved"""
+    nodes = sum(result.nodes for result in results)
+    seconds = sum(result.seconds for result in results)
+    scored = sum(result.solved is not None for result in results)
+    return {"positions": len(results), "scored": scored, "unscored": len(results) - scored,
+            "solved": sum(result.solved is True for result in results), "nodes": nodes,
+            "seconds": seconds, "nps": nodes / seconds if seconds > 0 else 0.0}
+
+def write_csv(results: list[EpdResult], path: str) -> None:
+    with open(path, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        for result in results:
+            row = result.as_dict()
+            row["best_moves"] = " ".join(result.best_moves)
+            row["avoid_moves"] = " ".join(result.avoid_moves)
+            writer.writerow(row)
+
+def write_json(results: list[EpdResult], path: str) -> None:
+    with open(path, "w") as file:
+        json.dump({"summary": summary(results), "positions": [result.as_dict() for result in results]}, file, indent=2)
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the AI on an EPD test suite")
+    parser.add_argument("epd", help="EPD file with bm and/or am operations")
+    parser.add_argument("--depth", type=int, default=None, help="plies to search each position")
+    parser.add_argument("--time", type=float, default=None, help="seconds per position")
+    parser.add_argument("--nodes", type=int, default=None, help="nodes per position")
+    parser.add_argument("--workers", type=int, default=None, help="processes, default one per core")
+    parser.add_argument("--hash", type=float, default=16, help="transposition table size in MB per process")
+    parser.add_argument("--bitbases", default=None, help="directory of endgame bitbase files")
+    parser.add_argument("--limit", type=int, default=None, help="only the first LIMIT positions")
+    parser.add_argument("--csv", default=None, help="write the results to this CSV file")
+    parser.add_argument("--json", default=None, help="write the results and a summary to this JSON file")
+    args = parser.parse_args(argv)
+
+    with open(args.epd, encoding="utf-8", errors="replace") as file:
+        positions = list(read_epd(file))[:args.limit]
+    results = run_suite(positions, args.depth, args.time, args.nodes, args.workers, args.hash, args.bitbases)
+    total = summary(results)
+    unscored = f" ({total['unscored']} unscored)" if total["unscored"] else ""
+    print(f"\nsolved {total['solved']}/{total['scored']}{unscored}  {total['nodes']} nodes  {total['seconds']:.2f}s  {total['nps']:.0f} nps")
+    if args.csv:
+        write_csv(results, args.csv)
+    if args.json:
+        write_json(results, args.json)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
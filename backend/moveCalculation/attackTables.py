@@ -0,0 +1,74 @@
+from ..chess import bitboard
+
+# Geometry that never changes, built once at import. All tables are indexed by bitboard square index.
+
+UP, DOWN, RIGHT, LEFT, UP_RIGHT, DOWN_RIGHT, UP_LEFT, DOWN_LEFT = range(8)
+ORTHOGONAL  = [UP, DOWN, RIGHT, LEFT]
+DIAGONAL    = [UP_RIGHT, DOWN_RIGHT, UP_LEFT, DOWN_LEFT]
+DIRECTIONS  = ORTHOGONAL + DIAGONAL
+STEP = {UP: (0, 1), DOWN: (0, -1), RIGHT: (1, 0), LEFT: (-1, 0),
+        UP_RIGHT: (1, 1), DOWN_RIGHT: (1, -1), UP_LEFT: (-1, 1), DOWN_LEFT: (-1, -1)}
+POSITIVE = {UP, RIGHT, UP_RIGHT, UP_LEFT} # directions in which the square index grows
+
+KNIGHT_STEPS = [(1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1), (-1, 2)]
+
+
+def _targets(square: int, steps: list[tuple[int, int]]) -> list[int]:
+    x, y = bitboard.square_pos(square)
+    return [(y + dy) * 8 + x + dx for dx, dy in steps if 0 <= x + dx < 8 and 0 <= y + dy < 8]
+
+def _ray(square: int, direction: int) -> list[int]:
+    x, y = bitboard.square_pos(square)
+    dx, dy = STEP[direction]
+    ray = list()
+    x, y = x + dx, y + dy
+    while 0 <= x < 8 and 0 <= y < 8:
+        ray.append(y * 8 + x)
+        x, y = x + dx, y + dy
+    return ray
+
+def _mask(squares: list[int]) -> int:
+    mask = 0
+    for square in squares:
+        mask |= 1 << square
+    return mask
+
+
+KNIGHT_TARGETS: list[list[int]] = [_targets(square, KNIGHT_STEPS) for square in range(64)]
+KING_TARGETS: list[list[int]]   = [_targets(square, list(STEP.values())) for square in range(64)]
+# PAWN_TARGETS[color][square]: squares a pawn of color on square attacks
+PAWN_TARGETS: list[list[list[int]]] = [[_targets(square, [(-1, 1), (1, 1)]) for square in range(64)],
+                                       [_targets(square, [(-1, -1), (1, -1)]) for square in range(64)]]
+# RAYS[direction][square]: squares in direction, ordered from square outwards
+RAYS: list[list[list[int]]] = [[_ray(square, direction) for square in range(64)] for direction in DIRECTIONS]
+
+KNIGHT_ATTACKS: list[int] = [_mask(targets) for targets in KNIGHT_TARGETS]
+KING_ATTACKS: list[int]   = [_mask(targets) for targets in KING_TARGETS]
+PAWN_ATTACKS: list[list[int]] = [[_mask(targets) for targets in PAWN_TARGETS[color]] for color in (bitboard.WHITE, bitboard.BLACK)]
+RAY_MASKS: list[list[int]] = [[_mask(ray) for ray in RAYS[direction]] for direction in DIRECTIONS]
+
+ORTHOGONAL_MASKS: list[int] = [RAY_MASKS[UP][square] | RAY_MASKS[DOWN][square] | RAY_MASKS[RIGHT][square] | RAY_MASKS[LEFT][square] for square in range(64)]
+DIAGONAL_MASKS: list[int]   = [RAY_MASKS[UP_RIGHT][square] | RAY_MASKS[DOWN_RIGHT][square] | RAY_MASKS[UP_LEFT][square] | RAY_MASKS[DOWN_LEFT][square] for square in range(64)]
+
+def _between(start: int, end: int) -> int:
+    for direction in DIRECTIONS:
+        ray = RAYS[direction][start]
+        if end in ray:
+            return _mask(ray[:ray.index(end)])
+    return 0
+
+# BETWEEN[a][b]: squares strictly between two squares on a common line, 0 if they are not aligned
+BETWEEN: list[list[int]] = [[_between(start, end) for end in range(64)] for start in range(64)]
+
+
+def slider_attacks_by_rays(square: int, occupied: int, directions: list[int]) -> int:
+    """Walks the rays, slow. Reference for the lookup tables in sliderAttacks"""
+    attacks = 0
+    for direction in directions:
+        ray = RAY_MASKS[direction][square]
+        blockers = ray & occupied
+        if blockers:
+            first = (blockers & -blockers).bit_length() - 1 if direction in POSITIVE else blockers.bit_length() - 1
+            ray ^= RAY_MASKS[direction][first]
+        attacks |= ray
+    return attacks
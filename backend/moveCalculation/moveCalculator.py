@@ -1,269 +1,242 @@
 from ..chess import Board
 from ..chess import Piece
 from ..chess import util
-from ..chess import BoardHistory
-class Dir:
-    Up = 0
-    Down = 1
-    Right = 2
-    Left = 3
-    Dirs = [Up, Down, Right, Left]
+from ..chess import bitboard
+from ..chess import move
+from . import attackTables as tables
+from .sliderAttacks import ROOK_ATTACKS, ROOK_MASKS, BISHOP_ATTACKS, BISHOP_MASKS
+
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+FULL = bitboard.FULL
+
+class GenerationMode:
+    All = 0
+    Captures = 1 # captures, en passant and promotions
+    Quiets = 2 # everything else, castling included
 
-class Diag:
-    UpRight     = (Dir.Up,      Dir.Right)
-    DownRight   = (Dir.Down,    Dir.Right)
-    UpLeft      = (Dir.Up,      Dir.Left)
-    DownLeft    = (Dir.Down,    Dir.Left)
-    Diags       = [UpRight, DownRight, UpLeft, DownLeft]
-    
-Knight_Moves = [(Dir.Up, Diag.UpRight),(Dir.Up, Diag.UpLeft),(Dir.Right, Diag.UpRight),(Dir.Right, Diag.DownRight),(Dir.Down, Diag.DownRight),(Dir.Down, Diag.DownLeft),(Dir.Left, Diag.UpLeft),(Dir.Left, Diag.DownLeft)]
 
 class MoveCalculator:
     def __init__(self):
-        self.possible_moves: list[tuple[int]] = list()
-        self.piece_function = {
-        Piece.Figure.Pawn   : self._pawn,
-        Piece.Figure.Rook   : self._rook,
-        Piece.Figure.Bishop : self._bishop,
-        Piece.Figure.Knight : self._knight,
-        Piece.Figure.King   : self._king,
-        Piece.Figure.Queen  : self._queen
-        }
+        self.legal_moves: list[int] = list()
         self._calculated_moves: dict[tuple[int], list[tuple[int]]] = dict()
-    
+
     def calc_all_valid_moves(self, board: Board) -> bool:
         """Calculates all possible moves and stores them in a dict. Returns False if no possible moves are allowed"""
-        self.board = board.get_copy()
-        move_possible = False
-        pieces = self.board.get_pieces()
-        self._calculated_moves = dict()
-        for piece in pieces:
-            if self.piece_function[piece.name](piece):
-                move_possible = True
+        self.legal_moves = self.generate_moves(board)
+        self._calculated_moves = {piece.pos: list() for piece in board.get_pieces()}
+        for legal_move in self.legal_moves:
+            if move.promotion(legal_move) not in (0, bitboard.QUEEN):
+                continue
+            start_pos, target_pos = move.to_positions(legal_move)
+            self._calculated_moves[start_pos].append(target_pos)
+        return bool(self.legal_moves)
 
-            self._calculated_moves.setdefault(piece.pos, self.possible_moves.copy())
-        # self.board = None
-        return move_possible
-    
     def get_possible_moves(self, piece: Piece) -> list[tuple[int]]:
         """get possible moves from either the square or the piece"""
         return self._calculated_moves[piece.pos]
-    
-    def _pawn(self, piece: Piece) -> None:
-        self.possible_moves = list()
-        forward = self._get_forward_for_piece(piece)
-        self._can_go(piece.pos, forward, piece)
-
-        if self._is_pawn_home(piece):
-            new_pos = self._move(piece.pos, forward)
-            self._can_go(new_pos, forward, piece)
 
-        self._can_take((forward, Dir.Right), piece)
-        self._can_take((forward, Dir.Left), piece)
-        return self.possible_moves
-
-    def _rook(self, piece: Piece) -> None:
-        self.possible_moves = list()
-        for dir in Dir.Dirs:
-            self._find_end(piece.pos, piece, dir)
-        return self.possible_moves
-
-    def _bishop(self, piece: Piece) -> None:
-        self.possible_moves = list()
-        for diag in Diag.Diags:
-            self._find_end(piece.pos, piece, diag)
-        return self.possible_moves
-
-    def _knight(self, piece: Piece) -> None:
-        self.possible_moves = list()
-        original_pos = piece.pos
-        for knight_move in Knight_Moves:
-            self._knight_move(piece, knight_move)
-            piece.set_pos(original_pos)
-        return self.possible_moves
-    
-    def _king(self, piece: Piece) -> None:
-        self.possible_moves = list()
-        for dir in Dir.Dirs:
-            self._king_move(piece, dir)
-        for diag in Diag.Diags:
-            self._king_move(piece, diag)
-        return self.possible_moves 
-    
-    def _queen(self, piece: Piece) -> None:
-        self.possible_moves = list()
-        for dir in Dir.Dirs:
-            self._find_end(piece.pos, piece, dir)
-        for diag in Diag.Diags:
-            self._find_end(piece.pos, piece, diag)
-        return self.possible_moves
-    
-    def _king_move(self, piece: Piece, dir: int | tuple, check_castling: bool = True) -> bool:
-        new_pos = self._move(piece.pos, dir)
-        enemy_king_pos = self.board.get_enemys_king_position(piece.color)
-        if not self._in_boundaries(new_pos):
-            return False
-        if self.board.kings_to_close(new_pos, enemy_king_pos):
-            return False
-        if self.board.has_piece(new_pos):
-            if self._are_hostile(piece, self.board.get_piece(new_pos)):
-                self.possible_moves.append(new_pos)
-            return False
-        if self.king_under_attack(piece, new_pos):
-            return False
-        self.possible_moves.append(new_pos)
-        if check_castling and dir == Dir.Right or dir == Dir.Left:
-            return self.check_castling(piece, dir, new_pos)
-        return True
-            
-    def check_castling(self, piece: Piece, dir: int, pos: tuple[int]) -> bool:
-        if not self.board.castling_rights[piece.color][util.CastlingRight.KingSide] and not self.board.castling_rights[piece.color][util.CastlingRight.QueenSide]:
-            return False
-        new_pos = self._move(pos, dir)
-        original_pos = piece.pos
-        if not new_pos[1] == util.color_home_rank[piece.color]:
-            return False
-        
-        
-        
-        side = util.get_castling_side(new_pos)
-        if side is None or not self.board.castling_rights[piece.color][side]:
+    def generate_moves(self, board: Board, mode: int = GenerationMode.All) -> list[int]:
+        """All legal moves of the side to move as encoded moves (see chess.move), or only the captures or quiets of them.
+        Checkers and pins are found once, so no move has to be played to test its legality"""
+        self.board = board
+        us = bitboard.COLOR_INDEX[board.color_to_move]
+        them = us ^ 1
+        bitboards = board.bitboards
+        own = board.occupancy[us]
+        occupied = board.occupied
+        base = us * 6
+        king = bitboard.lsb(bitboards[base + KING])
+        checkers = self._attackers(king, them, occupied)
+        if mode == GenerationMode.Captures:
+            kind_mask = board.occupancy[them]
+        elif mode == GenerationMode.Quiets:
+            kind_mask = ~occupied
+        else:
+            kind_mask = FULL
+
+        moves = list()
+        self._king_moves(moves, king, them, own, occupied, kind_mask)
+        if checkers & (checkers - 1): # double check: only the king can move
+            return moves
+        if checkers:
+            target_mask = checkers | tables.BETWEEN[king][bitboard.lsb(checkers)]
+        else:
+            target_mask = FULL
+            if mode != GenerationMode.Captures:
+                self._castling_moves(moves, us, them, occupied)
+        pins = self._pins(king, them, own, occupied)
+        targets = ~own & target_mask & kind_mask
+
+        for square in bitboard.iter_bits(bitboards[base + KNIGHT]):
+            if square in pins: # a pinned knight can never stay on the pin ray
+                continue
+            for target in bitboard.iter_bits(tables.KNIGHT_ATTACKS[square] & targets):
+                moves.append(square | target << 6)
+        for square in bitboard.iter_bits(bitboards[base + BISHOP] | bitboards[base + QUEEN]):
+            for target in bitboard.iter_bits(BISHOP_ATTACKS[square][occupied & BISHOP_MASKS[square]] & targets & pins.get(square, FULL)):
+                moves.append(square | target << 6)
+        for square in bitboard.iter_bits(bitboards[base + ROOK] | bitboards[base + QUEEN]):
+            for target in bitboard.iter_bits(ROOK_ATTACKS[square][occupied & ROOK_MASKS[square]] & targets & pins.get(square, FULL)):
+                moves.append(square | target << 6)
+        self._pawn_moves(moves, us, king, checkers, target_mask, pins, mode)
+        return moves
+
+    def is_legal(self, board: Board, candidate: int) -> bool:
+        """Checks a move that did not come from the generator for this position (transposition table, killer moves)"""
+        self.board = board
+        start = candidate & 63
+        target = candidate >> 6 & 63
+        promotion = candidate >> 12
+        us = bitboard.COLOR_INDEX[board.color_to_move]
+        piece = board.mailbox[start]
+        if piece is None or bitboard.COLOR_INDEX[piece.color] != us or board.occupancy[us] >> target & 1:
             return False
-        if self.king_under_attack_if_piece_goes(new_pos, piece):
+        figure = bitboard.FIGURE_INDEX[piece.name]
+        occupied = board.occupied
+        if figure == PAWN:
+            forward = 8 if us == bitboard.WHITE else -8
+            if bool((bitboard.RANK_8 | bitboard.RANK_1) >> target & 1) != bool(promotion) or promotion > QUEEN:
+                return False
+            if target == start + forward:
+                reachable = not occupied >> target & 1
+            elif target == start + 2 * forward:
+                home_rank = bitboard.RANKS[1] if us == bitboard.WHITE else bitboard.RANKS[6]
+                reachable = home_rank >> start & 1 and not occupied >> (start + forward) & 1 and not occupied >> target & 1
+            else:
+                reachable = tables.PAWN_ATTACKS[us][start] >> target & 1 and (board.occupancy[us ^ 1] >> target & 1 or target == board.ep_square)
+            if not reachable:
+                return False
+        elif promotion:
             return False
-        piece.set_pos(pos)
-        if not self._king_move(piece, dir, False):
-            piece.set_pos(original_pos)
+        elif figure == KING and abs(target - start) == 2:
+            return candidate in self.generate_moves(board, GenerationMode.Quiets)
+        elif not self._attacks(figure, start, us, occupied) >> target & 1:
             return False
-        piece.set_pos(original_pos)
-        self.possible_moves.append(new_pos)
-        return True
-            
+        undo = board.make_move(candidate)
+        legal = not self._attackers(bitboard.lsb(board.bitboards[us * 6 + KING]), us ^ 1, board.occupied)
+        board.unmake_move(undo)
+        return legal
 
-    def king_under_attack_if_piece_goes(self, new_pos: tuple, piece: Piece) -> bool:
-        old_pos = piece.pos
-        board = self.board.get_copy()
-        self.board.handle_move(old_pos, new_pos, check_en_passant=False)
-        king = self.board.get_king_from_color(self.board.color_to_move)
-        check = self.king_under_attack(king)
+    def in_check(self, board: Board) -> bool:
         self.board = board
-        piece.set_pos(old_pos)
-        return check
-            
-    def king_under_attack(self, piece: Piece, pos: tuple | None = None) -> bool:
-        if pos is None:
-            pos = piece.pos
+        us = bitboard.COLOR_INDEX[board.color_to_move]
+        return bool(self._attackers(bitboard.lsb(board.bitboards[us * 6 + KING]), us ^ 1, board.occupied))
 
+    def king_under_attack(self, piece: Piece, pos: tuple | None = None) -> bool:
         if piece.name != Piece.Figure.King:
             raise Exception(f"Piece {piece.name} is not a King as expected")
-        
-        for dir in Dir.Dirs:
-            pieces = [Piece.Figure.Queen, Piece.Figure.Rook]
-            new_piece = self.find_piece_in_dir(pos, dir)
-            if new_piece and new_piece.color != piece.color and new_piece.name in pieces:
-                return True
-
-        for diag in Diag.Diags:
-            pieces = [Piece.Figure.Queen, Piece.Figure.Bishop]
-            new_piece = self.find_piece_in_dir(pos, diag)
-            if new_piece and new_piece.color != piece.color and new_piece.name in pieces:
-                return True
-        
-        for dir in Dir.Dirs:
-            pieces = [Piece.Figure.Pawn]
-            new_piece = self.find_piece_in_dir(pos, dir, repeat=False)
-            if new_piece and new_piece.color != piece.color and new_piece.name in pieces:
-                return True
-        
-        for dirs in Knight_Moves:
-            pieces = [Piece.Figure.Knight]
-            new_piece = self.find_piece_in_dir(pos, dirs, repeat=False)
-            if new_piece and new_piece.color != piece.color and new_piece.name in pieces:
-                return True
-        return False
-
-    def find_piece_in_dir(self, pos: tuple, dir: Dir | tuple, repeat: bool = True) -> Piece | None:
-        while True:
-            new_pos = self._move(pos, dir)
-            if not self._in_boundaries(new_pos):
-                return None
-            if not self.board.has_piece(new_pos):
-                if repeat:
-                    pos = new_pos
-                    continue
+        if pos is None:
+            pos = piece.pos
+        return self.square_attacked(bitboard.square_index(pos), bitboard.COLOR_INDEX[piece.color], bitboard.square_index(piece.pos))
+
+    def square_attacked(self, square: int, color: int, ignore: int | None = None) -> bool:
+        """True if the opponent of color attacks square. The piece on ignore (the king that wants to go to square) blocks nothing"""
+        occupied = self.board.occupied
+        if ignore is not None:
+            occupied &= ~(1 << ignore)
+        return bool(self._attackers(square, color ^ 1, occupied))
+
+    def _attacks(self, figure: int, square: int, us: int, occupied: int) -> int:
+        if figure == KNIGHT:
+            return tables.KNIGHT_ATTACKS[square]
+        if figure == KING:
+            return tables.KING_ATTACKS[square]
+        if figure == PAWN:
+            return tables.PAWN_ATTACKS[us][square]
+        attacks = 0
+        if figure != BISHOP:
+            attacks |= ROOK_ATTACKS[square][occupied & ROOK_MASKS[square]]
+        if figure != ROOK:
+            attacks |= BISHOP_ATTACKS[square][occupied & BISHOP_MASKS[square]]
+        return attacks
+
+    def _attackers(self, square: int, them: int, occupied: int) -> int:
+        """Pieces of color them attacking square, given the occupancy"""
+        bitboards = self.board.bitboards
+        base = them * 6
+        queens = bitboards[base + QUEEN]
+        return (tables.KNIGHT_ATTACKS[square] & bitboards[base + KNIGHT]
+                | tables.PAWN_ATTACKS[them ^ 1][square] & bitboards[base + PAWN]
+                | tables.KING_ATTACKS[square] & bitboards[base + KING]
+                | ROOK_ATTACKS[square][occupied & ROOK_MASKS[square]] & (bitboards[base + ROOK] | queens)
+                | BISHOP_ATTACKS[square][occupied & BISHOP_MASKS[square]] & (bitboards[base + BISHOP] | queens))
+
+    def _pins(self, king: int, them: int, own: int, occupied: int) -> dict[int, int]:
+        """Pinned own pieces mapped to the ray they may still move on (up to and including the pinner)"""
+        bitboards = self.board.bitboards
+        base = them * 6
+        queens = bitboards[base + QUEEN]
+        pinners = tables.ORTHOGONAL_MASKS[king] & (bitboards[base + ROOK] | queens) | tables.DIAGONAL_MASKS[king] & (bitboards[base + BISHOP] | queens)
+        pins = dict()
+        for pinner in bitboard.iter_bits(pinners):
+            between = tables.BETWEEN[king][pinner]
+            blockers = between & occupied
+            if blockers and not blockers & (blockers - 1) and blockers & own:
+                pins[bitboard.lsb(blockers)] = between | 1 << pinner
+        return pins
+
+    def _king_moves(self, moves: list[int], king: int, them: int, own: int, occupied: int, kind_mask: int) -> None:
+        without_king = occupied & ~(1 << king)
+        for target in bitboard.iter_bits(tables.KING_ATTACKS[king] & ~own & kind_mask):
+            if not self._attackers(target, them, without_king):
+                moves.append(king | target << 6)
+
+    def _castling_moves(self, moves: list[int], us: int, them: int, occupied: int) -> None:
+        color = bitboard.COLORS[us]
+        for side in util.CastlingRight:
+            if not self.board.castling & bitboard.CASTLING_BIT[(color, side)]:
+                continue
+            home = util.color_home_rank[color] * 8
+            rook_start = home + util.rook_castling_start_position[side]
+            king_start = home + 4
+            king_target = home + side.value
+            if tables.BETWEEN[king_start][rook_start] & occupied:
+                continue
+            passing = (king_start + king_target) // 2
+            if self._attackers(passing, them, occupied) or self._attackers(king_target, them, occupied):
+                continue
+            moves.append(king_start | king_target << 6)
+
+    def _pawn_moves(self, moves: list[int], us: int, king: int, checkers: int, target_mask: int, pins: dict[int, int], mode: int) -> None:
+        board = self.board
+        occupied = board.occupied
+        enemies = board.occupancy[us ^ 1]
+        forward = 8 if us == bitboard.WHITE else -8
+        home_rank = bitboard.RANKS[1] if us == bitboard.WHITE else bitboard.RANKS[6]
+        promotion_rank = bitboard.RANK_8 if us == bitboard.WHITE else bitboard.RANK_1
+        ep_square = board.ep_square
+        attacks = tables.PAWN_ATTACKS[us]
+        if mode == GenerationMode.Captures:
+            capture_mask, push_mask = enemies, promotion_rank
+        elif mode == GenerationMode.Quiets:
+            capture_mask, push_mask = 0, ~promotion_rank
+            ep_square = None
+        else:
+            capture_mask, push_mask = enemies, FULL
+        for square in bitboard.iter_bits(board.bitboards[us * 6 + PAWN]):
+            allowed = target_mask & pins.get(square, FULL)
+            targets = attacks[square] & capture_mask & allowed
+            one = square + forward
+            if not occupied >> one & 1:
+                targets |= 1 << one & allowed & push_mask
+                if home_rank >> square & 1 and not occupied >> (one + forward) & 1:
+                    targets |= 1 << (one + forward) & allowed & push_mask
+            for target in bitboard.iter_bits(targets):
+                if promotion_rank >> target & 1:
+                    for figure in move.PROMOTION_FIGURES:
+                        moves.append(square | target << 6 | figure << 12)
                 else:
-                    return None
-            piece = self.board.get_piece(new_pos)
-            return piece
-            
-    def _knight_move(self, piece: Piece, dir: tuple):
-        if self._can_go(piece.pos, dir, piece):
-            return
-        if self._can_take(dir, piece):
-            return
-        
-    def _find_end(self, pos: tuple, piece: Piece, dir: int | tuple) -> None:
-        repeat = True
-        while repeat:
-            new_pos = self._move(pos, dir)
-            if not self._in_boundaries(new_pos):
-                return
-            if self.board.has_piece(new_pos):
-                repeat = False
-                if not self._are_hostile(piece, self.board.get_piece(new_pos)):
-                    return
-            if not self.king_under_attack_if_piece_goes(new_pos, piece):
-                self.possible_moves.append(new_pos)
-            pos = new_pos
-
-    def _move(self, pos: tuple, dir: int | tuple) -> tuple:
-        if isinstance(dir, int):
-            if dir == Dir.Up:
-                return (pos[0], pos[1] + 1)
-            elif dir == Dir.Down:
-                return (pos[0], pos[1]-1)
-            elif dir == Dir.Right:
-                return (pos[0]+1, pos[1])
-            elif dir == Dir.Left:
-                return (pos[0]-1, pos[1])
-        if isinstance(dir, tuple):
-            for d in dir:
-                pos = self._move(pos,d)
-            return pos
-
-    def _in_boundaries(self, pos: tuple) -> bool:
-        return 0 <= pos[0] < 8 and 0 <= pos[1] < 8
-
-    def _are_hostile(self, piece_1: Piece, piece_2: Piece) -> bool:
-        return piece_1.color != piece_2.color
-
-    def _get_forward_for_piece(self, piece: Piece) -> Dir:
-        if piece.color == Piece.Color.White:
-            return Dir.Up
-        elif piece.color == Piece.Color.Black:
-            return Dir.Down
-
-    def _is_pawn_home(self, piece: Piece) -> bool:
-        y = piece.pos[1]
-        if piece.name != Piece.Figure.Pawn:
-            raise Exception("You checked if pawn is home, but piece is not a pawn")
-        return piece.color == Piece.Color.White and y == 1 or piece.color == Piece.Color.Black and y == 6
-
-    def _can_take(self, dir: Dir | tuple, piece: Piece) -> bool:
-        new_pos = self._move(piece.pos, dir)
-        if self.board.en_passant == new_pos:
-            self.possible_moves.append(new_pos)
-            return True
-        if not self._in_boundaries(new_pos):
+                    moves.append(square | target << 6)
+            if ep_square is not None and attacks[square] >> ep_square & 1 and self._en_passant_legal(square, ep_square, ep_square - forward, king, checkers, us):
+                moves.append(square | ep_square << 6)
+
+    def _en_passant_legal(self, square: int, target: int, taken: int, king: int, checkers: int, us: int) -> bool:
+        """En passant removes two pieces from a line at once, so pins can not describe it. Test the resulting occupancy instead"""
+        bitboards = self.board.bitboards
+        base = (us ^ 1) * 6
+        if checkers & (bitboards[base + KNIGHT] | bitboards[base + PAWN]) and not checkers >> taken & 1:
             return False
-        can_take = self.board.has_piece(new_pos) and self._are_hostile(piece, self.board.get_piece(new_pos)) and not self.king_under_attack_if_piece_goes(new_pos, piece)
-        if can_take:
-            self.possible_moves.append(new_pos)
-        return can_take
-
-    def _can_go(self, pos: tuple, dir: Dir | tuple, piece: Piece) -> bool:
-        new_pos = self._move(pos, dir)
-        can_go = self._in_boundaries(new_pos) and not self.board.has_piece(new_pos) and not self.king_under_attack_if_piece_goes(new_pos, piece)
-        if can_go:
-            self.possible_moves.append(new_pos)
-        return can_go
\ No newline at end of file
+        occupied = self.board.occupied & ~(1 << square | 1 << taken) | 1 << target
+        queens = bitboards[base + QUEEN]
+        return not (ROOK_ATTACKS[king][occupied & ROOK_MASKS[king]] & (bitboards[base + ROOK] | queens)
+                    or BISHOP_ATTACKS[king][occupied & BISHOP_MASKS[king]] & (bitboards[base + BISHOP] | queens))
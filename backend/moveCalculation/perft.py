@@ -0,0 +1,186 @@
+"""Perft: counts the leaf nodes of the legal move tree. Checks MoveCalculator against known counts and measures its speed.
+
+python -m backend.moveCalculation.perft --suite
+python -m backend.moveCalculation.perft --fen "<fen>" --depth 4 --divide
+python -m backend.moveCalculation.perft --suite --baseline perft_baseline.json [--write-baseline]
+"""
+import argparse
+import json
+import sys
+import time
+from typing import NamedTuple
+
+from ..chess import Board
+from ..chess import move
+from ..chess.board import START_FEN
+from .moveCalculator import MoveCalculator
+
+
+class PerftPosition(NamedTuple):
+    name: str
+    fen: str
+    nodes: list[int] # nodes[depth - 1]
+
+class PerftResult(NamedTuple):
+    name: str
+    depth: int
+    nodes: int
+    expected: int | None
+    seconds: float
+
+    @property
+    def nps(self) -> float:
+        return self.nodes / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.expected is None or self.nodes == self.expected
+
+
+SUITE = [
+    PerftPosition("start",                  START_FEN, [20, 400, 8902, 197281, 4865609]),
+    PerftPosition("kiwipete",               "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1", [48, 2039, 97862, 4085603]),
+    PerftPosition("position 3",             "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", [14, 191, 2812, 43238, 674624]),
+    PerftPosition("position 4",             "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1", [6, 264, 9467, 422333]),
+    PerftPosition("position 4 mirrored",    "r2q1rk1/pP1p2pp/Q4n2/bbp1p3/Np6/1B3NBn/pPPP1PPP/R3K2R b KQ - 0 1", [6, 264, 9467, 422333]),
+    PerftPosition("position 5",             "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", [44, 1486, 62379, 2103487]),
+    PerftPosition("position 6",             "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10", [46, 2079, 89890, 3894594]),
+    PerftPosition("illegal ep 1",           "3k4/3p4/8/K1P4r/8/8/8/8 b - - 0 1", [18, 92, 1670, 10138, 185429, 1134888]),
+    PerftPosition("illegal ep 2",           "8/8/4k3/8/2p5/8/B2P2K1/8 w - - 0 1", [13, 102, 1266, 10276, 135655, 1015133]),
+    PerftPosition("ep gives check",         "8/8/1k6/2b5/2pP4/8/5K2/8 b - d3 0 1", [15, 126, 1928, 13931, 206379, 1440467]),
+    PerftPosition("short castle check",     "5k2/8/8/8/8/8/8/4K2R w K - 0 1", [15, 66, 1198, 6399, 120330, 661072]),
+    PerftPosition("long castle check",      "3k4/8/8/8/8/8/8/R3K3 w Q - 0 1", [16, 71, 1286, 7418, 141077, 803711]),
+    PerftPosition("castling rights",        "r3k2r/1b4bq/8/8/8/8/7B/R3K2R w KQkq - 0 1", [26, 1141, 27826, 1274206]),
+    PerftPosition("castling prevented",     "r3k2r/8/3Q4/8/8/5q2/8/R3K2R b KQkq - 0 1", [44, 1494, 50509, 1720476]),
+    PerftPosition("promote out of check",   "2K2r2/4P3/8/8/8/8/8/3k4 w - - 0 1", [11, 133, 1442, 19174, 266199, 3821001]),
+    PerftPosition("discovered check",       "8/8/1P2K3/8/2n5/1q6/8/5k2 b - - 0 1", [29, 165, 5160, 31961, 1004658]),
+    PerftPosition("promote to check",       "4k3/1P6/8/8/8/8/K7/8 w - - 0 1", [9, 40, 472, 2661, 38983, 217342]),
+    PerftPosition("underpromote to check",  "8/P1k5/K7/8/8/8/8/8 w - - 0 1", [6, 27, 273, 1329, 18135, 92683]),
+    PerftPosition("self stalemate",         "K1k5/8/P7/8/8/8/8/8 w - - 0 1", [2, 6, 13, 63, 382, 2217]),
+    PerftPosition("stalemate and mate",     "8/k1P5/8/1K6/8/8/8/8 w - - 0 1", [10, 25, 268, 926, 10857, 43261, 567584]),
+    PerftPosition("stalemate and mate 2",   "8/8/2k5/5q2/5n2/8/5K2/8 b - - 0 1", [37, 183, 6559, 23527]),
+]
+
+
+def perft(board: Board, depth: int, move_calculator: MoveCalculator | None = None) -> int:
+    """Number of leaf nodes depth plies below board. The last ply is counted, not played"""
+    if move_calculator is None:
+        move_calculator = MoveCalculator()
+    moves = move_calculator.generate_moves(board)
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+    nodes = 0
+    for legal_move in moves:
+        undo = board.make_move(legal_move)
+        nodes += perft(board, depth - 1, move_calculator)
+        board.unmake_move(undo)
+    return nodes
+
+def divide(board: Board, depth: int, move_calculator: MoveCalculator | None = None) -> dict[str, int]:
+    """perft split by root move (uci notation), to find the move a wrong count comes from"""
+    if move_calculator is None:
+        move_calculator = MoveCalculator()
+    counts = dict()
+    for legal_move in move_calculator.generate_moves(board):
+        undo = board.make_move(legal_move)
+        counts[move.to_uci(legal_move)] = perft(board, depth - 1, move_calculator)
+        board.unmake_move(undo)
+    return counts
+
+def run_position(position: PerftPosition, depth: int) -> PerftResult:
+    board = Board.from_fen(position.fen)
+    start = time.perf_counter()
+    nodes = perft(board, depth)
+    seconds = time.perf_counter() - start
+    expected = position.nodes[depth - 1] if depth <= len(position.nodes) else None
+    return PerftResult(position.name, depth, nodes, expected, seconds)
+
+def run_suite(max_nodes: int = 1_000_000, max_depth: int | None = None, report=print) -> list[PerftResult]:
+    """Runs every suite position at the deepest known depth that stays below max_nodes"""
+    results = list()
+    for position in SUITE:
+        depth = 1
+        for known_depth, nodes in enumerate(position.nodes, start=1):
+            if nodes <= max_nodes and (max_depth is None or known_depth <= max_depth):
+                depth = known_depth
+        result = run_position(position, depth)
+        results.append(result)
+        if report:
+            report(format_result(result))
+    return results
+
+def format_result(result: PerftResult) -> str:
+    status = "ok" if result.ok else f"FAIL expected {result.expected}"
+    return f"{result.name:<24} depth {result.depth}  nodes {result.nodes:>9}  {result.seconds:7.2f}s  {result.nps:>9.0f} nps  {status}"
+
+def compare_to_baseline(results: list[PerftResult], baseline: dict, tolerance: float) -> list[str]:
+    """Regressions against a baseline written by write_baseline: wrong node counts, or total nps more than tolerance below.
+    Single positions run for milliseconds, so only the total is stable enough to compare speed"""
+    problems = list()
+    for result in results:
+        entry = baseline.get("positions", dict()).get(result.name)
+        if entry is not None and entry["depth"] == result.depth and entry["nodes"] != result.nodes:
+            problems.append(f"{result.name}: {result.nodes} nodes, baseline has {entry['nodes']}")
+    total_seconds = sum(result.seconds for result in results)
+    total_nps = sum(result.nodes for result in results) / total_seconds if total_seconds else 0
+    if total_nps < baseline.get("total_nps", 0) * (1 - tolerance):
+        problems.append(f"{total_nps:.0f} nps in total, baseline {baseline['total_nps']} nps")
+    return problems
+
+def write_baseline(results: list[PerftResult], path: str) -> None:
+    positions = {result.name: {"depth": result.depth, "nodes": result.nodes, "seconds": round(result.seconds, 4), "nps": round(result.nps)} for result in results}
+    total_nodes = sum(result.nodes for result in results)
+    total_seconds = sum(result.seconds for result in results)
+    with open(path, "w") as file:
+        json.dump({"total_nodes": total_nodes, "total_nps": round(total_nodes / total_seconds) if total_seconds else 0, "positions": positions}, file, indent=2)
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Count and time legal move tree leaves")
+    parser.add_argument("--fen", default=None, help="position to count, default start position")
+    parser.add_argument("--depth", type=int, default=None, help="plies to count (suite: highest depth to use)")
+    parser.add_argument("--divide", action="store_true", help="print node counts per root move")
+    parser.add_argument("--suite", action="store_true", help="run the built in positions with known counts")
+    parser.add_argument("--max-nodes", type=int, default=1_000_000, help="suite: skip depths with more nodes than this")
+    parser.add_argument("--baseline", default=None, help="suite: JSON file to compare against (or to write)")
+    parser.add_argument("--write-baseline", action="store_true", help="suite: store this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="suite: allowed relative nps drop against the baseline")
+    args = parser.parse_args(argv)
+
+    if not args.suite:
+        board = Board.from_fen(args.fen or START_FEN)
+        depth = args.depth or 4
+        start = time.perf_counter()
+        if args.divide:
+            counts = divide(board, depth)
+            for uci, nodes in sorted(counts.items()):
+                print(f"{uci}: {nodes}")
+            nodes = sum(counts.values())
+            print(f"\nmoves {len(counts)}")
+        else:
+            nodes = perft(board, depth)
+        seconds = time.perf_counter() - start
+        print(f"nodes {nodes}  {seconds:.2f}s  {nodes / seconds if seconds else 0:.0f} nps")
+        return 0
+
+    results = run_suite(args.max_nodes, args.depth)
+    total_nodes = sum(result.nodes for result in results)
+    total_seconds = sum(result.seconds for result in results)
+    print(f"\ntotal {total_nodes} nodes  {total_seconds:.2f}s  {total_nodes / total_seconds if total_seconds else 0:.0f} nps")
+    failed = [result for result in results if not result.ok]
+    if failed:
+        print(f"{len(failed)} position(s) with wrong node counts")
+    if args.baseline and args.write_baseline:
+        write_baseline(results, args.baseline)
+        print(f"baseline written to {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline) as file:
+            problems = compare_to_baseline(results, json.load(file), args.tolerance)
+        for problem in problems:
+            print(f"regression: {problem}")
+        if problems:
+            return 1
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
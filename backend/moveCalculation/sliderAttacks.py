@@ -0,0 +1,68 @@
+import marshal
+import os
+
+from . import attackTables as tables
+
+# Rook and bishop attacks looked up by the occupancy of the squares that can block them.
+# ROOK_ATTACKS[square][occupied & ROOK_MASKS[square]] is the attack set of a rook on square.
+# Edge squares never block anything behind them, so they are left out of the masks.
+# This is the magic bitboard idea with the multiply-and-shift index replaced by a dict lookup,
+# which is the cheaper way to turn a 64 bit key into a slot in Python.
+
+CACHE_VERSION = 1
+CACHE_FILE = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+                          "chessSim", f"slider_attacks_v{CACHE_VERSION}.marshal")
+
+
+def _blocker_mask(square: int, directions: list[int]) -> int:
+    mask = 0
+    for direction in directions:
+        for target in tables.RAYS[direction][square][:-1]:
+            mask |= 1 << target
+    return mask
+
+def _build(masks: list[int], directions: list[int]) -> list[dict[int, int]]:
+    attacks = list()
+    for square, mask in enumerate(masks):
+        by_occupancy = dict()
+        subset = 0
+        while True: # walk all subsets of mask (carry rippler)
+            by_occupancy[subset] = tables.slider_attacks_by_rays(square, subset, directions)
+            subset = (subset - mask) & mask
+            if subset == 0:
+                break
+        attacks.append(by_occupancy)
+    return attacks
+
+def _load() -> tuple[list[dict[int, int]], list[dict[int, int]]]:
+    """Reads the tables from the cache file, builds and caches them if that fails"""
+    try:
+        with open(CACHE_FILE, "rb") as file:
+            rook_attacks, bishop_attacks = marshal.load(file)
+        if len(rook_attacks) == 64 and len(bishop_attacks) == 64:
+            return rook_attacks, bishop_attacks
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+    rook_attacks = _build(ROOK_MASKS, tables.ORTHOGONAL)
+    bishop_attacks = _build(BISHOP_MASKS, tables.DIAGONAL)
+    try:
+        os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+        temporary_file = f"{CACHE_FILE}.{os.getpid()}.tmp"
+        with open(temporary_file, "wb") as file:
+            marshal.dump((rook_attacks, bishop_attacks), file)
+        os.replace(temporary_file, CACHE_FILE)
+    except OSError:
+        pass # read only home, build again next time
+    return rook_attacks, bishop_attacks
+
+
+ROOK_MASKS: list[int]   = [_blocker_mask(square, tables.ORTHOGONAL) for square in range(64)]
+BISHOP_MASKS: list[int] = [_blocker_mask(square, tables.DIAGONAL) for square in range(64)]
+ROOK_ATTACKS, BISHOP_ATTACKS = _load()
+
+
+def rook_attacks(square: int, occupied: int) -> int:
+    return ROOK_ATTACKS[square][occupied & ROOK_MASKS[square]]
+
+def bishop_attacks(square: int, occupied: int) -> int:
+    return BISHOP_ATTACKS[square][occupied & BISHOP_MASKS[square]]
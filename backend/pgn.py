@@ -0,0 +1,351 @@
+"""Reading and writing PGN game collections.
+
+Games are streamed one at a time, so files of any size can be read, and a game's headers and movetext are only
+parsed when they are asked for: games filtered out by their headers never have their moves parsed or played.
+
+python -m backend.pgn reader
+python -m backend.pgn roundtrip [--games N] [--plies N] [--seed N]
+"""
+import argparse
+import io
+import mmap
+import os
+import random
+import re
+import sys
+import tempfile
+
+from .chess import Board
+from .chess.board import START_FEN
+from .moveCalculation.moveCalculator import MoveCalculator
+from . import san
+
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+SEVEN_TAG_ROSTER = ("Event", "Site", "Date", "Round", "White", "Black", "Result") # written first, in this order
+LINE_LENGTH = 80 # movetext lines are wrapped before this length
+_UNKNOWN = {"Date": "????.??.??", "Result": "*"} # seven tag roster values of unknown headers, "?" for the others
+_HEADER = re.compile(r'\[(\w+)\s+"((?:[^"\\]|\\.)*)"\]')
+_ESCAPE = re.compile(r'\\(.)')
+_COMMENT = re.compile(r"\{[^}]*\}|;[^\n]*")
+_MOVE_NUMBER = re.compile(r"^\d+\.+")
+
+
+class PgnGame:
+    """One game as read from a PGN file. Headers and movetext are kept as read and parsed on first access"""
+    def __init__(self, header_lines: list[str], movetext: str):
+        self._header_lines = header_lines
+        self.movetext = movetext
+        self._headers: dict[str, str] | None = None
+        self._moves: list[str] | None = None
+
+    @classmethod
+    def from_moves(cls, headers: dict[str, str], moves: list[str]) -> "PgnGame":
+        game = cls(list(), "")
+        game._headers = headers
+        game._moves = moves
+        return game
+
+    @property
+    def headers(self) -> dict[str, str]:
+        if self._headers is None:
+            self._headers = parse_headers(self._header_lines)
+        return self._headers
+
+    @property
+    def moves(self) -> list[str]:
+        """SAN of the main line"""
+        if self._moves is None:
+            self._moves = parse_movetext(self.movetext)
+        return self._moves
+
+    @property
+    def result(self) -> str:
+        return self.headers.get("Result", "*")
+
+    def start_board(self) -> Board:
+        return Board.from_fen(self.headers.get("FEN", START_FEN))
+
+    def play(self, move_calculator: MoveCalculator | None = None):
+        """Plays the main line on a board from the game's start position, yielding (board, move) before every move is made.
+        The same board is yielded every time. Stops with an Exception at the first illegal or unreadable move"""
+        if move_calculator is None:
+            move_calculator = MoveCalculator()
+        board = self.start_board()
+        for san_move in self.moves:
+            move = san.parse_san(board, san_move, move_calculator)
+            yield board, move
+            board.make_move(move)
+
+    def final_board(self, move_calculator: MoveCalculator | None = None) -> Board:
+        if move_calculator is None:
+            move_calculator = MoveCalculator()
+        board = self.start_board()
+        for san_move in self.moves:
+            board.make_move(san.parse_san(board, san_move, move_calculator))
+        return board
+
+
+def read_games(lines, where=None):
+    """Games of a PGN file (or any iterable of lines), one at a time.
+    where(headers) -> bool filters by headers: the movetext of a game it rejects is skipped without being kept.
+    Movetext lines are joined with newlines, a ; comment ends at the end of its line.
+    A header after movetext, after an empty line or repeating a header name starts the next game, so games without moves are kept"""
+    header_lines: list[str] = list()
+    header_names: set[str] = set()
+    movetext: list[str] = list()
+    skipping = False
+    blank = False # an empty line since the last header
+    for line in lines:
+        line = line.strip()
+        if not line:
+            blank = True
+            continue
+        if line[0] == "%":
+            continue
+        match = _HEADER.match(line) if line[0] == "[" else None
+        if match:
+            if movetext or skipping or header_lines and (blank or match.group(1) in header_names):
+                game = _finished_game(header_lines, movetext, skipping, where)
+                if game:
+                    yield game
+                header_lines, header_names, movetext = list(), set(), list()
+                skipping = False
+            header_lines.append(line)
+            header_names.add(match.group(1))
+            blank = False
+            continue
+        blank = False
+        if where is not None and not movetext and not skipping:
+            skipping = not where(parse_headers(header_lines))
+        if not skipping:
+            movetext.append(line)
+    game = _finished_game(header_lines, movetext, skipping, where)
+    if game:
+        yield game
+
+def _finished_game(header_lines: list[str], movetext: list[str], skipping: bool, where) -> PgnGame | None:
+    """The game read so far, None if there is none or where rejects it"""
+    if skipping or not (header_lines or movetext):
+        return None
+    if where is not None and not movetext and not where(parse_headers(header_lines)):
+        return None # where is asked when the movetext starts, a game without moves wasn't asked yet
+    return PgnGame(header_lines, "\n".join(movetext))
+
+def open_games(path: str, where=None, use_mmap: bool = False, encoding: str = "utf-8"):
+    """Streams the games of a PGN file, see read_games. With use_mmap the file is memory mapped instead of read
+    through a file buffer, which lets the operating system share and cache the pages of big files"""
+    with open(path, "rb") as file:
+        if use_mmap:
+            if not file.seek(0, io.SEEK_END):
+                return # an empty file can't be mapped
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield from read_games((line.decode(encoding, errors="replace") for line in iter(mapped.readline, b"")), where)
+        else:
+            yield from read_games(io.TextIOWrapper(file, encoding=encoding, errors="replace"), where)
+
+def parse_headers(header_lines: list[str]) -> dict[str, str]:
+    headers = dict()
+    for line in header_lines:
+        match = _HEADER.match(line)
+        if match:
+            headers[match.group(1)] = _ESCAPE.sub(r"\1", match.group(2))
+    return headers
+
+def parse_movetext(movetext: str) -> list[str]:
+    """SAN moves of the main line. Comments, variations, NAGs, move numbers and the result are dropped"""
+    movetext = _COMMENT.sub(" ", movetext)
+    moves = list()
+    variation_depth = 0
+    for token in movetext.replace("(", " ( ").replace(")", " ) ").split():
+        if token == "(":
+            variation_depth += 1
+        elif token == ")":
+            variation_depth -= 1
+        elif variation_depth or token.startswith("$") or token in RESULTS:
+            continue
+        else:
+            token = _MOVE_NUMBER.sub("", token)
+            if token:
+                moves.append(token)
+    return moves
+
+
+def format_game(headers: dict[str, str], moves: list[str]) -> str:
+    """A game as PGN text: the seven tag roster, the other headers, then the movetext wrapped at LINE_LENGTH"""
+    result = headers.get("Result", "*")
+    lines = list()
+    for name in SEVEN_TAG_ROSTER + tuple(name for name in headers if name not in SEVEN_TAG_ROSTER):
+        value = str(headers.get(name, _UNKNOWN.get(name, "?"))).replace("\\", "\\\\").replace('"', '\\"')
+        lines.append(f'[{name} "{value}"]')
+    lines.append("")
+
+    fen = headers.get("FEN", START_FEN).split()
+    black_first = len(fen) > 1 and fen[1] == "b"
+    move_number = int(fen[5]) if len(fen) > 5 else 1
+    tokens = list()
+    for ply, move in enumerate(moves):
+        white_to_move = (ply % 2 == 0) != black_first
+        if white_to_move:
+            tokens.append(f"{move_number}.")
+        elif ply == 0:
+            tokens.append(f"{move_number}...")
+        if not white_to_move:
+            move_number += 1
+        tokens.append(move)
+    tokens.append(result)
+
+    line = ""
+    for token in tokens:
+        if line and len(line) + 1 + len(token) >= LINE_LENGTH:
+            lines.append(line)
+            line = token
+        else:
+            line = f"{line} {token}" if line else token
+    lines.append(line)
+    return "\n".join(lines) + "\n\n"
+
+
+class PgnWriter:
+    """Appends games to a PGN file. Text is collected in memory and written in blocks of about buffer_size characters"""
+    def __init__(self, path: str, append: bool = False, buffer_size: int = 1 << 20, encoding: str = "utf-8"):
+        self._file = open(path, "a" if append else "w", encoding=encoding, newline="\n")
+        self._buffer: list[str] = list()
+        self._buffered = 0
+        self.buffer_size = buffer_size
+        self.games = 0
+
+    def __enter__(self) -> "PgnWriter":
+        return self
+
+    def __exit__(self, *exception) -> None:
+        self.close()
+
+    def write_game(self, game) -> None:
+        """Writes a Game (see chess.game, its as_pgn) or a PgnGame"""
+        if isinstance(game, PgnGame):
+            self.write(game.headers, game.moves)
+        else:
+            headers = game.as_pgn()
+            moves = headers.pop("Moves")
+            self.write(headers, moves)
+
+    def write_games(self, games) -> int:
+        written = self.games
+        for game in games:
+            self.write_game(game)
+        return self.games - written
+
+    def write(self, headers: dict[str, str], moves: list[str]) -> None:
+        text = format_game(headers, moves)
+        self._buffer.append(text)
+        self._buffered += len(text)
+        self.games += 1
+        if self._buffered >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        self._file.write("".join(self._buffer))
+        self._buffer = list()
+        self._buffered = 0
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+
+
+# PGN texts with the (Event header, main line) of every game read_games must find in them
+READER_CASES = [
+    ('[Event "semicolon"]\n\n1. e4 e5 ; king pawns, the comment ends here\n2. Nf3 Nc6 *\n',
+     [("semicolon", ["e4", "e5", "Nf3", "Nc6"])]),
+    ('[Event "braces"]\n\n1. e4 {a comment\nover two lines} e5 2. Nf3 {another} Nc6 1-0\n',
+     [("braces", ["e4", "e5", "Nf3", "Nc6"])]),
+    ('[Event "variations"]\n\n1. e4 (1. d4 d5 (1... Nf6 2. c4) 2. c4) 1... e5 (1... c5 2. Nf3) 2. Nf3 *\n',
+     [("variations", ["e4", "e5", "Nf3"])]),
+    ('[Event "nags"]\n\n1. e4 $1 e5 $2 2. Nf3 $14 Nc6 1/2-1/2\n',
+     [("nags", ["e4", "e5", "Nf3", "Nc6"])]),
+    ('[Event "a"]\n\n1. e4 *\n\n[Event "no moves"]\n[Result "*"]\n\n[Event "c"]\n\n1. d4 *\n',
+     [("a", ["e4"]), ("no moves", []), ("c", ["d4"])]),
+    ('[Event "x"]\n[Event "y"]\n1. c4 *\n',
+     [("x", []), ("y", ["c4"])]),
+]
+
+def check_reader() -> list[str]:
+    """Reads READER_CASES, returns what was read differently from what was expected"""
+    problems = list()
+    for text, expected in READER_CASES:
+        read = [(game.headers.get("Event"), game.moves) for game in read_games(text.splitlines())]
+        if read != expected:
+            problems.append(f"{expected[0][0]}: read {read} instead of {expected}")
+    return problems
+
+def round_trip(game, path: str) -> list[str]:
+    """Writes a Game (see chess.game) to path and reads it back with read_games.
+    Returns the differences between the game and what was read, empty if there are none"""
+    with PgnWriter(path) as writer:
+        writer.write_game(game)
+    with open(path, encoding="utf-8") as file:
+        games = list(read_games(file))
+    if len(games) != 1:
+        return [f"{len(games)} games read back instead of 1"]
+    read = games[0]
+    problems = list()
+    if read.moves != game.moves:
+        problems.append(f"moves {read.moves} instead of {game.moves}")
+    if read.result != game.result:
+        problems.append(f"result {read.result} instead of {game.result}")
+    try:
+        fen = read.final_board().as_fen()
+        if fen != game.as_fen():
+            problems.append(f"final position {fen} instead of {game.as_fen()}")
+    except Exception as error:
+        problems.append(f"moves don't replay: {error}")
+    return problems
+
+def play_random_game(plies: int, rng: random.Random):
+    """A Game of up to plies random legal moves, played through the Game's own turn handling"""
+    from .chess.game import Game # the game module needs the AI, which this module doesn't
+    game = Game()
+    for _ in range(plies):
+        if game.lost_game():
+            break
+        game.play_move(rng.choice(game.move_calculator.legal_moves))
+        if not game.end_turn():
+            break
+    return game
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="PGN reading and writing checks")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("reader", help="read the built in PGN texts with comments, variations and games without moves")
+    check = commands.add_parser("roundtrip", help="play random games, write them and read them back")
+    check.add_argument("--games", type=int, default=20)
+    check.add_argument("--plies", type=int, default=200, help="highest number of half moves of a game")
+    check.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.command == "reader":
+        problems = check_reader()
+        for problem in problems:
+            print(problem)
+        print(f"{len(READER_CASES) - len(problems)}/{len(READER_CASES)} PGN texts read as expected")
+        return 1 if problems else 0
+    rng = random.Random(args.seed)
+    failed = 0
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "roundtrip.pgn")
+        for number in range(1, args.games + 1):
+            game = play_random_game(args.plies, rng)
+            problems = round_trip(game, path)
+            print(f"{number:>4}/{args.games}  {len(game.moves):>4} plies  {'ok' if not problems else 'FAILED'}")
+            for problem in problems:
+                print(f"      {problem}")
+            failed += bool(problems)
+    print(f"\n{args.games - failed}/{args.games} games read back unchanged")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+"""Position datasets: a header followed by one contiguous array of 32 byte positions (see chess.compact).
+The array can be opened with numpy.memmap for random access and zero-copy slicing, numpy is only needed for that.
+
+python -m backend.positionDataset.positionDataset build games.pgn [more.pgn ...] --out positions.bin [--every N]
+python -m backend.positionDataset.positionDataset info positions.bin
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+
+try:
+    import numpy as np
+except ImportError: # numpy is optional, only the array views need it
+    np = None
+
+from ..chess import Board
+from ..chess import compact
+from ..moveCalculation.moveCalculator import MoveCalculator
+from .. import pgn
+from .. import san
+
+MAGIC = b"CHSIMPOS"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQ") # magic, version, record bytes, record count
+HEADER_BYTES = 64 # the records start here, so they are aligned
+RESULT_LABELS = {"1-0": 1, "0-1": -1, "1/2-1/2": 0} # label of positions from PGN games: the result for White
+
+# numpy view of chess.compact.RECORD
+RECORD_DTYPE = np.dtype([("occupancy", "<u8"), ("pieces", "u1", (16,)), ("flags", "u1"), ("en_passant", "u1"),
+                         ("halfmove_clock", "u1"), ("reserved", "u1"), ("full_moves", "<u2"), ("label", "<i2")]) if np is not None else None
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise Exception("Array access to datasets needs numpy (pip install numpy)")
+
+def _read_header(file, path: str) -> int:
+    """Record count of the dataset file"""
+    file.seek(0)
+    magic, version, record_bytes, count = HEADER.unpack(file.read(HEADER.size).ljust(HEADER.size, b"\0"))
+    if magic != MAGIC or version != VERSION or record_bytes != compact.RECORD_BYTES:
+        raise Exception(f"{path} is no position dataset of version {VERSION}")
+    return count
+
+def _header(count: int) -> bytes:
+    return HEADER.pack(MAGIC, VERSION, compact.RECORD_BYTES, count).ljust(HEADER_BYTES, b"\0")
+
+
+class DatasetWriter:
+    """Writes positions to a dataset file, in blocks of buffer_records. The header's count is written on flush and close"""
+    def __init__(self, path: str, append: bool = False, buffer_records: int = 1 << 16):
+        self.path = path
+        if append and os.path.exists(path):
+            self._file = open(path, "r+b")
+            self.count = _read_header(self._file, path)
+            self._file.seek(HEADER_BYTES + self.count * compact.RECORD_BYTES)
+        else:
+            self._file = open(path, "w+b")
+            self.count = 0
+            self._file.write(_header(0))
+        self._buffer: list[bytes] = list()
+        self.buffer_records = buffer_records
+
+    def __enter__(self) -> "DatasetWriter":
+        return self
+
+    def __exit__(self, *exception) -> None:
+        self.close()
+
+    def write(self, board: Board, label: int = 0) -> None:
+        self.write_record(compact.encode(board, label))
+
+    def write_record(self, record: bytes) -> None:
+        self._buffer.append(record)
+        if len(self._buffer) >= self.buffer_records:
+            self.flush()
+
+    def flush(self) -> None:
+        self._file.write(b"".join(self._buffer))
+        self.count += len(self._buffer)
+        self._buffer = list()
+        end = self._file.tell()
+        self._file.seek(0)
+        self._file.write(_header(self.count))
+        self._file.seek(end)
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        self.flush()
+        self._file.close()
+
+
+class PositionDataset:
+    """Read access to a dataset file, memory mapped. Single positions come back as Boards,
+    records() is the whole array as a numpy.memmap, codes() piece codes for positionEvaluator.batchEvaluator"""
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self.count = _read_header(self._file, path)
+        if os.fstat(self._file.fileno()).st_size < HEADER_BYTES + self.count * compact.RECORD_BYTES:
+            raise Exception(f"{path} is truncated, the header announces {self.count} positions")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.count else None
+        self._records = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __enter__(self) -> "PositionDataset":
+        return self
+
+    def __exit__(self, *exception) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._records = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def record(self, index: int) -> bytes:
+        if not -self.count <= index < self.count:
+            raise IndexError(f"Position {index} out of range, the dataset has {self.count}")
+        start = HEADER_BYTES + (index % self.count) * compact.RECORD_BYTES
+        return self._map[start: start + compact.RECORD_BYTES]
+
+    def board(self, index: int) -> Board:
+        return compact.decode(self.record(index))
+
+    def label(self, index: int) -> int:
+        return compact.decode_label(self.record(index))
+
+    def records(self) -> "np.ndarray":
+        """All records as a read only structured array (RECORD_DTYPE) on the file, slices are views without copies"""
+        _require_numpy()
+        if self._records is None:
+            if self.count:
+                self._records = np.memmap(self.path, dtype=RECORD_DTYPE, mode="r", offset=HEADER_BYTES, shape=(self.count,))
+            else:
+                self._records = np.zeros(0, dtype=RECORD_DTYPE)
+        return self._records
+
+    def codes(self, start: int = 0, stop: int | None = None) -> "np.ndarray":
+        return records_to_codes(self.records()[start:stop])
+
+
+def records_to_codes(records: "np.ndarray") -> "np.ndarray":
+    """(N, 64) int8 piece codes (0 empty, 1 + Board.bitboards index) of records, decoded for the whole batch at once"""
+    _require_numpy()
+    occupied = ((records["occupancy"][:, None] >> np.arange(64, dtype=np.uint64)) & np.uint64(1)).astype(bool)
+    pieces = records["pieces"]
+    nibbles = np.empty((len(records), 32), dtype=np.int8)
+    nibbles[:, 0::2] = pieces & 15
+    nibbles[:, 1::2] = pieces >> 4
+    number = np.cumsum(occupied, axis=1) - 1 # which piece of the record stands on each square
+    codes = np.take_along_axis(nibbles, np.clip(number, 0, 31), axis=1) + 1
+    return np.where(occupied, codes, 0).astype(np.int8)
+
+def build_from_pgn(pgn_paths: list[str], path: str, every: int = 1, append: bool = False, report=print) -> int:
+    """Writes every every-th position of the finished games of the PGN files, labelled with the game result for White.
+    Returns the number of positions written"""
+    move_calculator = MoveCalculator()
+    written = 0
+    with DatasetWriter(path, append) as writer:
+        for pgn_path in pgn_paths:
+            games = pgn.open_games(pgn_path, where=lambda headers: headers.get("Result") in RESULT_LABELS)
+            for game in games:
+                label = RESULT_LABELS[game.result]
+                board = game.start_board()
+                for ply, san_move in enumerate(game.moves):
+                    if ply % every == 0:
+                        writer.write(board, label)
+                        written += 1
+                    try:
+                        board.make_move(san.parse_san(board, san_move, move_calculator))
+                    except Exception:
+                        break # broken movetext, keep the positions before it
+    if report:
+        report(f"{written} positions written, {writer.count} in {path}")
+    return written
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Build and inspect position datasets")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="store the positions of PGN games")
+    build.add_argument("pgn", nargs="+")
+    build.add_argument("--out", required=True, help="dataset file to write")
+    build.add_argument("--every", type=int, default=1, help="only every EVERY-th position of a game")
+    build.add_argument("--append", action="store_true", help="add to an existing dataset")
+    info = commands.add_parser("info", help="size and first positions of a dataset")
+    info.add_argument("dataset")
+    info.add_argument("--show", type=int, default=5, help="positions to print")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        build_from_pgn(args.pgn, args.out, args.every, args.append)
+        return 0
+    with PositionDataset(args.dataset) as dataset:
+        print(f"{len(dataset)} positions  {os.path.getsize(args.dataset)} bytes")
+        for index in range(min(args.show, len(dataset))):
+            print(f"{dataset.label(index):>3}  {dataset.board(index).as_fen()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
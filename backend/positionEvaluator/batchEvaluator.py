@@ -0,0 +1,121 @@
+"""Vectorized evaluation of many positions at once, for labelling datasets, tuning and game database analysis.
+
+Positions are int8 arrays, either (N, 64) piece codes (0 empty, 1 + Board.bitboards index otherwise)
+or (N, 12, 64) one-hot planes in Board.bitboards order. Scores match PositionEvaluator without bitbases.
+numpy is only needed for this module.
+"""
+try:
+    import numpy as np
+except ImportError: # numpy is optional, only batch evaluation needs it
+    np = None
+
+from ..chess import Board
+from ..chess import bitboard
+from . import pieceSquareTables as pst
+from . import pawnTable
+
+_FEN_CODES = {char: index + 1 for index, char in enumerate("PNBRQKpnbrqk")}
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise Exception("Batch evaluation needs numpy (pip install numpy)")
+
+def encode_board(board: Board) -> "np.ndarray":
+    """(64,) int8 piece codes of board"""
+    _require_numpy()
+    codes = np.zeros(64, dtype=np.int8)
+    for index, pieces in enumerate(board.bitboards):
+        for square in bitboard.iter_bits(pieces):
+            codes[square] = index + 1
+    return codes
+
+def encode_fen(fen: str) -> "np.ndarray":
+    """(64,) int8 piece codes of the placement field of fen, without building a Board"""
+    _require_numpy()
+    codes = np.zeros(64, dtype=np.int8)
+    for row, line in enumerate(fen.split()[0].split("/")):
+        square = (7 - row) * 8
+        for char in line:
+            if char.isdigit():
+                square += int(char)
+            else:
+                codes[square] = _FEN_CODES[char]
+                square += 1
+    return codes
+
+def encode_boards(boards, planes: bool = False) -> "np.ndarray":
+    _require_numpy()
+    codes = np.stack([encode_board(board) for board in boards]) if boards else np.zeros((0, 64), dtype=np.int8)
+    return to_planes(codes) if planes else codes
+
+def encode_fens(fens, planes: bool = False) -> "np.ndarray":
+    _require_numpy()
+    codes = np.stack([encode_fen(fen) for fen in fens]) if fens else np.zeros((0, 64), dtype=np.int8)
+    return to_planes(codes) if planes else codes
+
+def to_planes(codes: "np.ndarray") -> "np.ndarray":
+    """(N, 64) piece codes to (N, 12, 64) one-hot planes"""
+    _require_numpy()
+    return (codes[:, None, :] == np.arange(1, 13, dtype=np.int8)[None, :, None]).astype(np.int8)
+
+def to_codes(planes: "np.ndarray") -> "np.ndarray":
+    """(N, 12, 64) one-hot planes to (N, 64) piece codes"""
+    _require_numpy()
+    return (planes.astype(np.int8) * np.arange(1, 13, dtype=np.int8)[None, :, None]).sum(axis=1, dtype=np.int8)
+
+
+class BatchEvaluator:
+    """PositionEvaluator's terms as array operations over a whole batch"""
+    def __init__(self):
+        _require_numpy()
+        empty = [[0] * 64]
+        # row = piece code, column = square
+        self.midgame = np.array(empty + pst.MIDGAME, dtype=np.int64)
+        self.endgame = np.array(empty + pst.ENDGAME, dtype=np.int64)
+        self.phase = np.array([0] + pst.PHASE, dtype=np.int64)
+        # passed pawn bonus by rank (row 0) as seen from each side
+        self.passed_midgame = np.array(pawnTable.PASSED_MIDGAME, dtype=np.int64)
+        self.passed_endgame = np.array(pawnTable.PASSED_ENDGAME, dtype=np.int64)
+
+    def evaluate(self, positions: "np.ndarray") -> "np.ndarray":
+        """Scores in centipawns for White, one per position"""
+        codes = to_codes(positions) if positions.ndim == 3 else positions
+        codes = codes.astype(np.intp)
+        squares = np.arange(64)[None, :]
+        midgame = self.midgame[codes, squares].sum(axis=1)
+        endgame = self.endgame[codes, squares].sum(axis=1)
+        phase = np.minimum(self.phase[codes].sum(axis=1), pst.MAX_PHASE)
+        pawn_midgame, pawn_endgame = self.pawn_terms(codes)
+        midgame += pawn_midgame
+        endgame += pawn_endgame
+        return (midgame * phase + endgame * (pst.MAX_PHASE - phase)) // pst.MAX_PHASE
+
+    def pawn_terms(self, codes: "np.ndarray") -> tuple["np.ndarray", "np.ndarray"]:
+        """(midgame, endgame) doubled, isolated and passed pawn scores for White, like pawnTable.evaluate_pawns"""
+        white = (codes == bitboard.WHITE * 6 + bitboard.PAWN + 1).reshape(-1, 8, 8) # (N, rank, file)
+        black = (codes == bitboard.BLACK * 6 + bitboard.PAWN + 1).reshape(-1, 8, 8)
+        ranks = np.arange(8)[None, :, None]
+        # most advanced enemy pawn on the own and neighbouring files, a pawn level with it or beyond it is passed
+        black_front = self._neighbourhood(np.where(black, ranks, -1).max(axis=1), np.maximum, -1)
+        white_front = self._neighbourhood(np.where(white, ranks, 8).min(axis=1), np.minimum, 8)
+        white_passed = white & (ranks >= black_front[:, None, :])
+        black_passed = black & (ranks <= white_front[:, None, :])
+        midgame = np.zeros(len(codes), dtype=np.int64)
+        endgame = np.zeros(len(codes), dtype=np.int64)
+        for pawns, passed, rank_of, sign in ((white, white_passed, np.arange(8), 1), (black, black_passed, np.arange(7, -1, -1), -1)):
+            counts = pawns.sum(axis=1, dtype=np.int64) # pawns per file
+            doubled = np.maximum(counts - 1, 0).sum(axis=1)
+            isolated = (counts * (self._neighbourhood(counts, np.add, 0, own=False) == 0)).sum(axis=1)
+            passed_midgame = (passed * self.passed_midgame[rank_of][None, :, None]).sum(axis=(1, 2))
+            passed_endgame = (passed * self.passed_endgame[rank_of][None, :, None]).sum(axis=(1, 2))
+            midgame += sign * (pawnTable.DOUBLED[0] * doubled + pawnTable.ISOLATED[0] * isolated + passed_midgame)
+            endgame += sign * (pawnTable.DOUBLED[1] * doubled + pawnTable.ISOLATED[1] * isolated + passed_endgame)
+        return midgame, endgame
+
+    @staticmethod
+    def _neighbourhood(files: "np.ndarray", combine, empty: int, own: bool = True) -> "np.ndarray":
+        """(N, 8) per file values combined with the neighbouring files (and the file itself if own)"""
+        padded = np.pad(files, ((0, 0), (1, 1)), constant_values=empty)
+        result = combine(padded[:, :-2], padded[:, 2:])
+        return combine(result, files) if own else result
@@ -0,0 +1,100 @@
+from array import array
+
+from ..chess import Board
+from ..chess import bitboard
+
+# Pawn structure terms in centipawns, (midgame, endgame)
+DOUBLED = (-10, -20) # per pawn beyond the first on a file
+ISOLATED = (-10, -15) # per pawn without own pawns on the neighbouring files
+PASSED_MIDGAME = [0, 5, 10, 20, 35, 60, 100, 0] # by rank seen from the pawn's side
+PASSED_ENDGAME = [0, 10, 20, 40, 70, 120, 200, 0]
+
+ENTRY_BYTES = 32 # 8 byte key, 2 * 4 byte scores, 2 * 8 byte passed pawn masks
+
+
+def _adjacent_files(x: int) -> int:
+    return (bitboard.FILES[x - 1] if x > 0 else 0) | (bitboard.FILES[x + 1] if x < 7 else 0)
+
+ADJACENT_FILES: list[int] = [_adjacent_files(x) for x in range(8)]
+# Squares in front of a pawn on its own and the neighbouring files: a passed pawn has no enemy pawn there
+PASSED_MASKS: list[list[int]] = [[0] * 64, [0] * 64]
+for _square in range(64):
+    _x, _y = _square & 7, _square >> 3
+    _span = bitboard.FILES[_x] | ADJACENT_FILES[_x]
+    for _rank in range(8):
+        if _rank > _y:
+            PASSED_MASKS[bitboard.WHITE][_square] |= _span & bitboard.RANKS[_rank]
+        elif _rank < _y:
+            PASSED_MASKS[bitboard.BLACK][_square] |= _span & bitboard.RANKS[_rank]
+
+
+def _side_terms(pawns: int, enemy_pawns: int, color: int) -> tuple[int, int, int]:
+    """(midgame, endgame, passed pawns) of the pawns of one side"""
+    midgame = endgame = passed = 0
+    for x in range(8):
+        count = bitboard.popcount(pawns & bitboard.FILES[x])
+        if count > 1:
+            midgame += DOUBLED[0] * (count - 1)
+            endgame += DOUBLED[1] * (count - 1)
+        if count and not pawns & ADJACENT_FILES[x]:
+            midgame += ISOLATED[0] * count
+            endgame += ISOLATED[1] * count
+    masks = PASSED_MASKS[color]
+    for square in bitboard.iter_bits(pawns):
+        if not enemy_pawns & masks[square]:
+            passed |= 1 << square
+            rank = square >> 3 if color == bitboard.WHITE else 7 - (square >> 3)
+            midgame += PASSED_MIDGAME[rank]
+            endgame += PASSED_ENDGAME[rank]
+    return midgame, endgame, passed
+
+def evaluate_pawns(white_pawns: int, black_pawns: int) -> tuple[int, int, int, int]:
+    """(midgame, endgame, White passed pawns, Black passed pawns), scores for White"""
+    white_midgame, white_endgame, white_passed = _side_terms(white_pawns, black_pawns, bitboard.WHITE)
+    black_midgame, black_endgame, black_passed = _side_terms(black_pawns, white_pawns, bitboard.BLACK)
+    return white_midgame - black_midgame, white_endgame - black_endgame, white_passed, black_passed
+
+
+class PawnTable:
+    """Fixed size cache of evaluate_pawns keyed by the board's pawn key. A new entry overwrites whatever is in its slot.
+    Pawn structures repeat all over a search tree, so nearly every probe hits"""
+    def __init__(self, size_mb: float = 1):
+        self.probes = 0
+        self.hits = 0
+        self.resize(size_mb)
+
+    def resize(self, size_mb: float) -> None:
+        entries = 1 << (max(1, int(size_mb * 1024 * 1024) // ENTRY_BYTES).bit_length() - 1) # power of two, so the index is a mask
+        self._mask = entries - 1
+        # An unused slot reads as key 0 with all terms 0, which is the right entry for the pawnless position (key 0)
+        self._keys = array("Q", bytes(8 * entries))
+        self._midgame = array("i", bytes(4 * entries))
+        self._endgame = array("i", bytes(4 * entries))
+        self._white_passed = array("Q", bytes(8 * entries))
+        self._black_passed = array("Q", bytes(8 * entries))
+
+    @property
+    def size_mb(self) -> float:
+        return len(self._keys) * ENTRY_BYTES / (1024 * 1024)
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.probes if self.probes else 0.0
+
+    def clear(self) -> None:
+        self.resize(self.size_mb)
+        self.probes = self.hits = 0
+
+    def probe(self, board: Board) -> tuple[int, int, int, int]:
+        """evaluate_pawns of the board's pawns, from the table if they are in it"""
+        key = board.pawn_hash
+        index = key & self._mask
+        self.probes += 1
+        if self._keys[index] == key:
+            self.hits += 1
+            return self._midgame[index], self._endgame[index], self._white_passed[index], self._black_passed[index]
+        bitboards = board.bitboards
+        entry = evaluate_pawns(bitboards[bitboard.WHITE * 6 + bitboard.PAWN], bitboards[bitboard.BLACK * 6 + bitboard.PAWN])
+        self._keys[index] = key
+        self._midgame[index], self._endgame[index], self._white_passed[index], self._black_passed[index] = entry
+        return entry
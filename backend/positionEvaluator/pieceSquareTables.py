@@ -0,0 +1,122 @@
+# Material and piece-square values in centipawns, for the middlegame and the endgame.
+# Indexed like Board.bitboards: White pawn .. king = 0..5, Black pawn .. king = 6..11, squares A1 = 0 .. H8 = 63.
+# Black values are the mirrored White values with the sign flipped, so a sum over all pieces is the score for White.
+# This module must not import chess: the board keeps running totals of these values and imports it.
+
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+
+MATERIAL_MIDGAME = [100, 320, 330, 500, 900, 0]
+MATERIAL_ENDGAME = [120, 300, 320, 520, 920, 0]
+
+# Game phase: 24 with all pieces on the board, 0 with only kings and pawns
+PHASE_WEIGHTS = [0, 1, 1, 2, 4, 0]
+MAX_PHASE = 24
+
+# Tables as seen from White, rank 8 first
+_PAWN = [
+      0,   0,   0,   0,   0,   0,   0,   0,
+     50,  50,  50,  50,  50,  50,  50,  50,
+     10,  10,  20,  30,  30,  20,  10,  10,
+      5,   5,  10,  25,  25,  10,   5,   5,
+      0,   0,   0,  20,  20,   0,   0,   0,
+      5,  -5, -10,   0,   0, -10,  -5,   5,
+      5,  10,  10, -20, -20,  10,  10,   5,
+      0,   0,   0,   0,   0,   0,   0,   0]
+_PAWN_ENDGAME = [
+      0,   0,   0,   0,   0,   0,   0,   0,
+     80,  80,  80,  80,  80,  80,  80,  80,
+     50,  50,  50,  50,  50,  50,  50,  50,
+     30,  30,  30,  30,  30,  30,  30,  30,
+     20,  20,  20,  20,  20,  20,  20,  20,
+     10,  10,  10,  10,  10,  10,  10,  10,
+     10,  10,  10,  10,  10,  10,  10,  10,
+      0,   0,   0,   0,   0,   0,   0,   0]
+_KNIGHT = [
+    -50, -40, -30, -30, -30, -30, -40, -50,
+    -40, -20,   0,   0,   0,   0, -20, -40,
+    -30,   0,  10,  15,  15,  10,   0, -30,
+    -30,   5,  15,  20,  20,  15,   5, -30,
+    -30,   0,  15,  20,  20,  15,   0, -30,
+    -30,   5,  10,  15,  15,  10,   5, -30,
+    -40, -20,   0,   5,   5,   0, -20, -40,
+    -50, -40, -30, -30, -30, -30, -40, -50]
+_BISHOP = [
+    -20, -10, -10, -10, -10, -10, -10, -20,
+    -10,   0,   0,   0,   0,   0,   0, -10,
+    -10,   0,   5,  10,  10,   5,   0, -10,
+    -10,   5,   5,  10,  10,   5,   5, -10,
+    -10,   0,  10,  10,  10,  10,   0, -10,
+    -10,  10,  10,  10,  10,  10,  10, -10,
+    -10,   5,   0,   0,   0,   0,   5, -10,
+    -20, -10, -10, -10, -10, -10, -10, -20]
+_ROOK = [
+      0,   0,   0,   0,   0,   0,   0,   0,
+      5,  10,  10,  10,  10,  10,  10,   5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+      0,   0,   0,   5,   5,   0,   0,   0]
+_QUEEN = [
+    -20, -10, -10,  -5,  -5, -10, -10, -20,
+    -10,   0,   0,   0,   0,   0,   0, -10,
+    -10,   0,   5,   5,   5,   5,   0, -10,
+     -5,   0,   5,   5,   5,   5,   0,  -5,
+      0,   0,   5,   5,   5,   5,   0,  -5,
+    -10,   5,   5,   5,   5,   5,   0, -10,
+    -10,   0,   5,   0,   0,   0,   0, -10,
+    -20, -10, -10,  -5,  -5, -10, -10, -20]
+_KING = [
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -20, -30, -30, -40, -40, -30, -30, -20,
+    -10, -20, -20, -20, -20, -20, -20, -10,
+     20,  20,   0,   0,   0,   0,  20,  20,
+     20,  30,  10,   0,   0,  10,  30,  20]
+_KING_ENDGAME = [
+    -50, -40, -30, -20, -20, -30, -40, -50,
+    -30, -20, -10,   0,   0, -10, -20, -30,
+    -30, -10,  20,  30,  30,  20, -10, -30,
+    -30, -10,  30,  40,  40,  30, -10, -30,
+    -30, -10,  30,  40,  40,  30, -10, -30,
+    -30, -10,  20,  30,  30,  20, -10, -30,
+    -30, -30,   0,   0,   0,   0, -30, -30,
+    -50, -30, -30, -30, -30, -30, -30, -50]
+
+_TABLES_MIDGAME = [_PAWN, _KNIGHT, _BISHOP, _ROOK, _QUEEN, _KING]
+_TABLES_ENDGAME = [_PAWN_ENDGAME, _KNIGHT, _BISHOP, _ROOK, _QUEEN, _KING_ENDGAME]
+
+
+def _combine(material: list[int], tables: list[list[int]]) -> list[list[int]]:
+    """Material plus table value for every piece index and square, negative for Black"""
+    combined = list()
+    for color in range(2):
+        for figure in range(6):
+            table = tables[figure]
+            if color == 0:
+                combined.append([material[figure] + table[(7 - (square >> 3)) * 8 + (square & 7)] for square in range(64)])
+            else:
+                combined.append([-material[figure] - table[square] for square in range(64)])
+    return combined
+
+MIDGAME = _combine(MATERIAL_MIDGAME, _TABLES_MIDGAME)
+ENDGAME = _combine(MATERIAL_ENDGAME, _TABLES_ENDGAME)
+PHASE = PHASE_WEIGHTS * 2
+
+
+def taper(midgame: int, endgame: int, phase: int) -> int:
+    """Blends the two scores by game phase"""
+    phase = min(phase, MAX_PHASE)
+    return (midgame * phase + endgame * (MAX_PHASE - phase)) // MAX_PHASE
+
+def compute(pieces) -> tuple[int, int, int]:
+    """(midgame, endgame, phase) totals of pieces, an iterable of (piece index, square). The full recompute the running totals are checked against"""
+    midgame = endgame = phase = 0
+    for index, square in pieces:
+        midgame += MIDGAME[index][square]
+        endgame += ENDGAME[index][square]
+        phase += PHASE[index]
+    return midgame, endgame, phase
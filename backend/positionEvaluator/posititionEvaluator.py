@@ -1,30 +1,67 @@
 from ..chess import Board
 from ..chess import Piece
 from ..chess import util
+from ..chess import bitboard
+from ..bitbases.bitbases import Bitbases, WIN, DRAW
+from . import pieceSquareTables as pst
+from .pawnTable import PawnTable, evaluate_pawns
+
+KNOWN_WIN = 10000 # a bitbase win, above any material difference and below mate scores
 
 class PositionEvaluator:
     def __init__(self):
-        self.piece_values = {   Piece.Figure.Pawn : 1,
-                                Piece.Figure.Knight : 3,
-                                Piece.Figure.Bishop : 3,
-                                Piece.Figure.Rook : 5,
-                                Piece.Figure.Queen : 9,
-                                Piece.Figure.King : 0}
+        self.piece_values = {figure: pst.MATERIAL_MIDGAME[index] for index, figure in enumerate(bitboard.FIGURES)} # centipawns
+        self.bitbases: Bitbases | None = None
+        self.pawn_table = PawnTable()
+
+    def stats(self) -> dict:
+        """Counters of the evaluation caches"""
+        return {"pawn_probes": self.pawn_table.probes, "pawn_hits": self.pawn_table.hits, "pawn_hit_rate": self.pawn_table.hit_rate}
+
+    def bitbase_evaluation(self, board: Board) -> int | None:
+        """Exact result of a bitbase position: 0 for a draw, KNOWN_WIN plus progress towards the mate for a win. None if not covered"""
+        if self.bitbases is None or bitboard.popcount(board.occupied) != 3:
+            return None
+        result = self.bitbases.probe(board)
+        if result is None:
+            return None
+        if result == DRAW:
+            return 0
+        winner = board.color_to_move if result == WIN else util.PlayerColor.opponent(board.color_to_move)
+        strong = bitboard.COLOR_INDEX[winner]
+        value = KNOWN_WIN + self._mating_progress(board, strong)
+        return value if winner == util.PlayerColor.White else -value
+
+    def _mating_progress(self, board: Board, strong: int) -> int:
+        """Bigger the closer the bare king is to the edge and to the attacking king, and the further the pawn is.
+        A promoted pawn scores more than one on the seventh rank, so the search does promote"""
+        bitboards = board.bitboards
+        strong_king = bitboard.lsb(bitboards[strong * 6 + bitboard.KING])
+        weak_king = bitboard.lsb(bitboards[(strong ^ 1) * 6 + bitboard.KING])
+        x, y = weak_king & 7, weak_king >> 3
+        edge_closeness = max(3 - x, x - 4) + max(3 - y, y - 4)
+        king_distance = abs(x - (strong_king & 7)) + abs(y - (strong_king >> 3))
+        progress = 10 * edge_closeness + 4 * (14 - king_distance)
+        pawns = bitboards[strong * 6 + bitboard.PAWN]
+        if pawns:
+            rank = bitboard.lsb(pawns) >> 3
+            progress += 20 * (rank if strong == bitboard.WHITE else 7 - rank)
+        else:
+            progress += 200
+        return progress
 
     def evaluate_current_position(self, board: Board) -> int:
-        """Evaluates current position of the board.A positive value means White has an advantage while a negative means black has an advantage"""
-        value = self._get_piece_value_evaluation(board)
-        return value
-    
-    def _get_piece_value_evaluation(self, board: Board) -> int:    
-        white_pieces = board.get_pieces(util.PlayerColor.White)
-        white_value = self._value_of_pieces(white_pieces)
-        black_pieces = board.get_pieces(util.PlayerColor.Black)
-        black_value = self._value_of_pieces(black_pieces)
-        return white_value-black_value
-    
-    def _value_of_pieces(self, pieces: list[Piece]) -> int:
-        value = 0
-        for piece in pieces:
-            value += self.piece_values[piece.name]
-        return value 
+        """Evaluates current position of the board in centipawns. A positive value means White has an advantage while a negative means black has an advantage"""
+        if self.bitbases is not None:
+            known = self.bitbase_evaluation(board)
+            if known is not None:
+                return known
+        pawn_midgame, pawn_endgame, _, _ = self.pawn_table.probe(board)
+        return pst.taper(board.midgame + pawn_midgame, board.endgame + pawn_endgame, board.phase)
+
+    def full_evaluation(self, board: Board) -> int:
+        """Same as evaluate_current_position without bitbases, but summed up over all pieces instead of read from the board's running totals and the pawn table"""
+        midgame, endgame, phase = pst.compute((bitboard.piece_index(piece.name, piece.color), square) for square, piece in enumerate(board.mailbox) if piece)
+        bitboards = board.bitboards
+        pawn_midgame, pawn_endgame, _, _ = evaluate_pawns(bitboards[bitboard.WHITE * 6 + bitboard.PAWN], bitboards[bitboard.BLACK * 6 + bitboard.PAWN])
+        return pst.taper(midgame + pawn_midgame, endgame + pawn_endgame, phase)
@@ -1,11 +1,18 @@
 from .chess import Board
 from .chess import Piece
+from .chess import bitboard
+from .moveCalculation.moveCalculator import MoveCalculator
+
+SQUARE_NAMES = [f"{'abcdefgh'[square & 7]}{(square >> 3) + 1}" for square in range(64)]
+CASTLING_SAN = {"O-O": 6, "0-0": 6, "O-O-O": 2, "0-0-0": 2} # king target file
 
 class San:
     def __init__(self):
         self.san = ""
+        self.move_calculator = MoveCalculator()
 
     def add(self, piece: Piece, start_pos: str, end_pos: str, board: Board, taken_piece_name: str | None = None, promotion_name: str | None = None, check: bool = False, check_mate: bool = False):
+        """Adds a move to the turn being written. board is the position before the move"""
         figure_name = piece.name.capitalize()
         disambiguation = None
         takes = ""
@@ -40,5 +47,125 @@ class San:
         return san
 
     def check_disambiguation(self, start_pos: str, end_pos: str, board: Board) -> str:
-        #TODO
-        return ""
\ No newline at end of file
+        start = bitboard.to_index(start_pos)
+        target = bitboard.to_index(end_pos)
+        if board.mailbox[start].name == Piece.Figure.Pawn:
+            return SQUARE_NAMES[start][0] if start & 7 != target & 7 else "" # a capturing pawn always names its file
+        return disambiguation(board, start, target, self.move_calculator.generate_moves(board))
+
+
+def disambiguation(board: Board, start: int, target: int, legal_moves: list[int]) -> str:
+    """What SAN adds to the figure to tell the move from start apart from other legal moves of the same figure to target:
+    nothing, the file, the rank or the whole square"""
+    mailbox = board.mailbox
+    figure = mailbox[start].name
+    ambiguous = same_file = same_rank = False
+    for other in legal_moves:
+        other_start = other & 63
+        if other_start == start or other >> 6 & 63 != target or mailbox[other_start].name != figure:
+            continue
+        ambiguous = True
+        same_file |= other_start & 7 == start & 7
+        same_rank |= other_start >> 3 == start >> 3
+    if not ambiguous:
+        return ""
+    if not same_file:
+        return SQUARE_NAMES[start][0]
+    if not same_rank:
+        return SQUARE_NAMES[start][1]
+    return SQUARE_NAMES[start]
+
+def _san_without_check(board: Board, move: int, legal_moves: list[int]) -> str:
+    start = move & 63
+    target = move >> 6 & 63
+    piece = board.mailbox[start]
+    if piece.name == Piece.Figure.King and abs(target - start) == 2:
+        return "O-O" if target & 7 == 6 else "O-O-O"
+    captures = board.mailbox[target] is not None
+    if piece.name == Piece.Figure.Pawn:
+        captures = captures or target == board.ep_square
+        text = f"{SQUARE_NAMES[start][0]}x{SQUARE_NAMES[target]}" if captures else SQUARE_NAMES[target]
+        if move >> 12:
+            text += "=" + bitboard.FIGURES[move >> 12].upper()
+        return text
+    return f"{piece.name.upper()}{disambiguation(board, start, target, legal_moves)}{'x' if captures else ''}{SQUARE_NAMES[target]}"
+
+def to_san(board: Board, move: int, legal_moves: list[int] | None = None, move_calculator: MoveCalculator | None = None) -> str:
+    """Standard Algebraic Notation of a legal move of board, like 'Nbd7', 'exd6', 'O-O-O' or 'e8=Q#'.
+    Pass the legal moves of board if they are at hand. The replies are only generated when the move gives check, to tell mate"""
+    if move_calculator is None:
+        move_calculator = MoveCalculator()
+    if legal_moves is None:
+        legal_moves = move_calculator.generate_moves(board)
+    text = _san_without_check(board, move, legal_moves)
+    undo = board.make_move(move)
+    if move_calculator.in_check(board):
+        text += "+" if move_calculator.generate_moves(board) else "#"
+    board.unmake_move(undo)
+    return text
+
+def line_to_san(board: Board, moves: list[int], move_calculator: MoveCalculator | None = None) -> list[str]:
+    """SAN of moves played one after the other from board, which is left as it was.
+    The legal moves after each move serve both its check or mate flag and the disambiguation of the next move,
+    so every move costs one move generation"""
+    if move_calculator is None:
+        move_calculator = MoveCalculator()
+    legal_moves = move_calculator.generate_moves(board)
+    sans = list()
+    undos = list()
+    try:
+        for move in moves:
+            if move not in legal_moves:
+                raise Exception(f"Move {move:#x} is not legal in {board.as_fen()}")
+            text = _san_without_check(board, move, legal_moves)
+            undos.append(board.make_move(move))
+            legal_moves = move_calculator.generate_moves(board)
+            if move_calculator.in_check(board):
+                text += "+" if legal_moves else "#"
+            sans.append(text)
+    finally:
+        for undo in reversed(undos):
+            board.unmake_move(undo)
+    return sans
+
+def parse_san(board: Board, san: str, move_calculator: MoveCalculator | None = None, legal_moves: list[int] | None = None) -> int:
+    """Encoded move (see chess.move) for a move in Standard Algebraic Notation like 'Nbd7', 'exd5', 'O-O' or 'e8=Q+'.
+    The move is matched against legal_moves, the legal moves of board, which are generated if not given"""
+    text = san.rstrip("+#!?")
+    if legal_moves is None:
+        legal_moves = (move_calculator or MoveCalculator()).generate_moves(board)
+    mailbox = board.mailbox
+    if text in CASTLING_SAN:
+        for legal_move in legal_moves:
+            start = legal_move & 63
+            target = legal_move >> 6 & 63
+            if mailbox[start].name == Piece.Figure.King and abs(target - start) == 2 and target & 7 == CASTLING_SAN[text]:
+                return legal_move
+        raise Exception(f"Castling {san} is not possible")
+
+    promotion = 0
+    if "=" in text:
+        text, promotion_name = text.split("=")
+        promotion = bitboard.FIGURE_INDEX[promotion_name.lower()]
+    elif text[-1] in "NBRQ":
+        promotion = bitboard.FIGURE_INDEX[text[-1].lower()]
+        text = text[:-1]
+    figure = text[0].lower() if text[0] in "NBRQK" else Piece.Figure.Pawn
+    if figure != Piece.Figure.Pawn:
+        text = text[1:]
+    text = text.replace("x", "").replace("-", "")
+    if len(text) < 2 or text[-2] not in "abcdefgh" or text[-1] not in "12345678":
+        raise Exception(f"No target square in {san}")
+    target = bitboard.to_index(text[-2:])
+    disambiguation = text[:-2]
+
+    candidates = list()
+    for legal_move in legal_moves:
+        start = legal_move & 63
+        if legal_move >> 6 & 63 != target or legal_move >> 12 != promotion or mailbox[start].name != figure:
+            continue
+        if all(char in SQUARE_NAMES[start] for char in disambiguation):
+            candidates.append(legal_move)
+    if len(candidates) != 1:
+        raise Exception(f"{san} is {'ambiguous' if candidates else 'not a legal move'}")
+    return candidates[0]